@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Benchmark books id scanning throughput (fast vs full parse) on a synthetic JSONL file."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from check_books_package import ID_SCAN_MODES, iter_lines, scan_book_lines
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Synthetic book rows to generate")
+    parser.add_argument(
+        "--events-per-book",
+        type=int,
+        default=4,
+        help="Reveal events per synthetic book (controls line length)",
+    )
+    parser.add_argument("--books", help="Benchmark an existing books file instead of generating one")
+    parser.add_argument("--keep", help="Write the synthetic file here and keep it")
+    return parser.parse_args()
+
+
+def write_synthetic_books(path: Path, rows: int, events_per_book: int) -> None:
+    board = [[(reel * 7 + row) % 11 for row in range(3)] for reel in range(5)]
+    events = [
+        {"index": i, "type": "reveal", "board": board, "wins": [{"symbol": "H1", "amount": 0}]}
+        for i in range(events_per_book)
+    ]
+    tail = json.dumps({"payoutMultiplier": 0, "events": events}, separators=(",", ":"))[1:]
+    with path.open("w", encoding="utf-8") as out:
+        for start in range(1, rows + 1, 100_000):
+            stop = min(start + 100_000, rows + 1)
+            out.write("".join(f'{{"id":{book_id},{tail}\n' for book_id in range(start, stop)))
+
+
+def time_mode(path: Path, id_scan: str) -> dict[str, float]:
+    started = time.perf_counter()
+    ids, lines, _, errors = scan_book_lines(iter_lines(path), 0, id_scan)
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": elapsed,
+        "lines": lines,
+        "ids": len(ids),
+        "errors": len(errors),
+        "lines_per_sec": lines / elapsed if elapsed > 0 else 0.0,
+        "mb_per_sec": path.stat().st_size / elapsed / 1e6 if elapsed > 0 else 0.0,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.books:
+            path = Path(args.books)
+        else:
+            path = Path(args.keep) if args.keep else Path(tmp) / "books_bench.jsonl"
+            write_synthetic_books(path, args.rows, args.events_per_book)
+
+        results = {mode: time_mode(path, mode) for mode in ID_SCAN_MODES}
+        summary = {
+            "books": str(path) if args.books or args.keep else "<synthetic>",
+            "bytes": path.stat().st_size,
+            "modes": results,
+            "speedup": results["full"]["seconds"] / max(results["fast"]["seconds"], 1e-9),
+        }
+    print(json.dumps(summary, separators=(",", ":")))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Benchmark books line reading: legacy text-mode reader vs binary chunked pipeline."""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+from bench_id_scan import write_synthetic_books
+from check_books_package import iter_lines
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic book rows to generate")
+    parser.add_argument("--events-per-book", type=int, default=4)
+    parser.add_argument("--books", help="Benchmark an existing .jsonl or .jsonl.zst file instead")
+    return parser.parse_args()
+
+
+def legacy_iter_lines(path: Path) -> Iterable[str]:
+    """Pre-pipeline reader kept for comparison: TextIOWrapper over the default buffers."""
+    if path.suffix == ".zst":
+        import zstandard as zstd
+
+        with path.open("rb") as src:
+            with zstd.ZstdDecompressor().stream_reader(src) as reader:
+                yield from io.TextIOWrapper(reader, encoding="utf-8")
+    else:
+        with path.open("r", encoding="utf-8") as src:
+            yield from src
+
+
+def compress(plain: Path) -> Path | None:
+    target = plain.with_name(plain.name + ".zst")
+    try:
+        import zstandard as zstd
+    except Exception:
+        if shutil.which("zstd") is None:
+            return None
+        subprocess.run(["zstd", "-q", "-3", "-f", "-o", str(target), str(plain)], check=True)
+        return target
+    with plain.open("rb") as src, target.open("wb") as out:
+        zstd.ZstdCompressor(level=3).copy_stream(src, out)
+    return target
+
+
+def time_reader(reader: Callable[[Path], Iterable], path: Path) -> dict[str, float]:
+    started = time.perf_counter()
+    lines = 0
+    size = 0
+    for line in reader(path):
+        lines += 1
+        size += len(line)
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": elapsed,
+        "lines": lines,
+        "lines_per_sec": lines / elapsed if elapsed > 0 else 0.0,
+        "mb_per_sec": size / elapsed / 1e6 if elapsed > 0 else 0.0,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        files: dict[str, Path] = {}
+        if args.books:
+            files["zst" if args.books.endswith(".zst") else "plain"] = Path(args.books)
+        else:
+            plain = Path(tmp) / "books_bench.jsonl"
+            write_synthetic_books(plain, args.rows, args.events_per_book)
+            files["plain"] = plain
+            compressed = compress(plain)
+            if compressed is not None:
+                files["zst"] = compressed
+
+        results: dict[str, dict[str, object]] = {}
+        for kind, path in files.items():
+            entry: dict[str, object] = {"bytes": path.stat().st_size}
+            try:
+                entry["legacy"] = time_reader(legacy_iter_lines, path)
+            except ImportError as exc:
+                entry["legacy"] = {"skipped": f"legacy reader unavailable: {exc}"}
+            entry["pipeline"] = time_reader(iter_lines, path)
+            legacy_seconds = entry["legacy"].get("seconds")
+            if legacy_seconds:
+                entry["speedup"] = legacy_seconds / max(entry["pipeline"]["seconds"], 1e-9)
+            results[kind] = entry
+
+    print(json.dumps({"files": results}, separators=(",", ":")))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
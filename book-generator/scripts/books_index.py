@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Build frame-chunked books with a random-access id index, and fetch single books by id."""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Any
+
+from check_books_package import (
+    LEADING_ID_RE,
+    SIDECAR_FRAME_FIELDS,
+    SIDECAR_VERSION,
+    frame_ids,
+    iter_lines,
+    load_books_sidecar,
+    pack_bytes,
+    parse_book_full,
+    sidecar_path_for,
+)
+
+SKIPPABLE_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Re-chunk a books file into zstd frames and write its index")
+    build.add_argument("--books", required=True, help="Source books_<mode>.jsonl or .jsonl.zst")
+    build.add_argument("--output", required=True, help="Frame-chunked books_<mode>.jsonl.zst to write")
+    build.add_argument("--index", help="Index path (default: <output>.idx)")
+    build.add_argument("--frame-rows", type=int, default=1000, help="Books per zstd frame")
+    build.add_argument("--level", type=int, default=9, help="zstd compression level")
+
+    lookup = commands.add_parser("lookup", help="Print one book by id")
+    lookup.add_argument("--books", required=True, help="Frame-chunked books .jsonl.zst")
+    lookup.add_argument("--index", help="Index path (default: <books>.idx)")
+    lookup.add_argument("--id", required=True, type=int, dest="book_id")
+    return parser.parse_args()
+
+
+def require_zstd() -> Any:
+    try:
+        import zstandard as zstd
+    except Exception as exc:
+        raise RuntimeError(f"books index requires zstandard package: {exc}") from exc
+    return zstd
+
+
+def seek_table(frame_sizes: list[tuple[int, int]]) -> bytes:
+    """zstd seekable-format seek table, stored in a skippable frame so plain zstd ignores it."""
+    entries = b"".join(struct.pack("<II", compressed, raw) for compressed, raw in frame_sizes)
+    footer = struct.pack("<IBI", len(frame_sizes), 0, SEEKABLE_MAGIC)
+    return struct.pack("<II", SKIPPABLE_MAGIC, len(entries) + len(footer)) + entries + footer
+
+
+def book_id_of(line: bytes) -> int:
+    match = LEADING_ID_RE.match(line)
+    if match is not None:
+        return int(match.group(1))
+    book_id, problems = parse_book_full(line)
+    if book_id is None:
+        raise ValueError("; ".join(problems) or "row has no id")
+    return book_id
+
+
+def frame_entry(offset: int, compressed_size: int, ids: array) -> list[Any]:
+    first_id, last_id = ids[0], ids[-1]
+    contiguous = last_id - first_id + 1 == len(ids) and all(
+        ids[i] == first_id + i for i in range(len(ids))
+    )
+    packed = None
+    if not contiguous:
+        members = array("q", ids)
+        if sys.byteorder == "big":
+            members.byteswap()
+        packed = pack_bytes(members.tobytes())
+    return [offset, compressed_size, len(ids), first_id, last_id, packed]
+
+
+def build_index(books: Path, output: Path, index: Path, frame_rows: int, level: int) -> dict[str, Any]:
+    zstd = require_zstd()
+    compressor = zstd.ZstdCompressor(level=level, write_content_size=True)
+    frames: list[list[Any]] = []
+    frame_sizes: list[tuple[int, int]] = []
+    offset = 0
+
+    with output.open("wb") as out:
+
+        def flush(lines: list[bytes], ids: array) -> None:
+            nonlocal offset
+            raw = b"".join(lines)
+            data = compressor.compress(raw)
+            out.write(data)
+            frames.append(frame_entry(offset, len(data), ids))
+            frame_sizes.append((len(data), len(raw)))
+            offset += len(data)
+
+        lines: list[bytes] = []
+        ids = array("q")
+        for line_no, line in enumerate(iter_lines(books), start=1):
+            if not line.strip():
+                continue
+            try:
+                ids.append(book_id_of(line))
+            except Exception as exc:
+                raise ValueError(f"books line {line_no}: {exc}") from exc
+            lines.append(line if line.endswith(b"\n") else line + b"\n")
+            if len(lines) >= frame_rows:
+                flush(lines, ids)
+                lines, ids = [], array("q")
+        if lines:
+            flush(lines, ids)
+
+        table = seek_table(frame_sizes)
+        out.write(table)
+
+    sidecar = {
+        "version": SIDECAR_VERSION,
+        "books": output.name,
+        "booksSize": offset + len(table),
+        "seekTableBytes": len(table),
+        "frameFields": list(SIDECAR_FRAME_FIELDS),
+        "frames": frames,
+    }
+    index.write_text(json.dumps(sidecar, separators=(",", ":")), encoding="utf-8")
+    return {
+        "books": str(output),
+        "index": str(index),
+        "frames": len(frames),
+        "rows": sum(frame[2] for frame in frames),
+        "bytes": sidecar["booksSize"],
+    }
+
+
+class BooksIndex:
+    """Id -> (frame, row) resolver over a loaded books index."""
+
+    def __init__(self, books: Path, sidecar: dict[str, Any]) -> None:
+        self.books = books
+        self.frames = sidecar["frames"]
+        self.ordered = all(frame[5] is None for frame in self.frames) and all(
+            prev[4] < cur[3] for prev, cur in zip(self.frames, self.frames[1:])
+        )
+        self.first_ids = [frame[3] for frame in self.frames]
+        self.decompressor = require_zstd().ZstdDecompressor()
+
+    def locate(self, book_id: int) -> tuple[int, int] | None:
+        if self.ordered:
+            frame_no = bisect.bisect_right(self.first_ids, book_id) - 1
+            if frame_no >= 0 and book_id <= self.frames[frame_no][4]:
+                return frame_no, book_id - self.frames[frame_no][3]
+            return None
+        for frame_no, frame in enumerate(self.frames):
+            if frame[5] is None:
+                if frame[3] <= book_id <= frame[4]:
+                    return frame_no, book_id - frame[3]
+                continue
+            try:
+                return frame_no, frame_ids(frame).index(book_id)
+            except ValueError:
+                continue
+        return None
+
+    def read(self, book_id: int) -> tuple[int, int, bytes] | None:
+        position = self.locate(book_id)
+        if position is None:
+            return None
+        frame_no, row = position
+        offset, compressed_size = self.frames[frame_no][:2]
+        with self.books.open("rb") as src:
+            src.seek(offset)
+            raw = self.decompressor.decompress(src.read(compressed_size))
+        start = 0
+        for _ in range(row):
+            start = raw.index(b"\n", start) + 1
+        end = raw.find(b"\n", start)
+        line = raw[start:] if end < 0 else raw[start:end]
+        if book_id_of(line) != book_id:
+            raise ValueError(f"books index points frame {frame_no} row {row} at a different id")
+        return frame_no, row, line
+
+
+def main() -> int:
+    args = parse_args()
+    books = Path(args.books)
+    if not books.exists():
+        print(f"books not found: {books}", file=sys.stderr)
+        return 2
+
+    if args.command == "build":
+        if args.frame_rows <= 0:
+            print("--frame-rows must be > 0", file=sys.stderr)
+            return 2
+        output = Path(args.output)
+        if output.resolve() == books.resolve():
+            print("--output must differ from --books", file=sys.stderr)
+            return 2
+        index = Path(args.index) if args.index else sidecar_path_for(output)
+        try:
+            summary = build_index(books, output, index, args.frame_rows, args.level)
+        except Exception as exc:
+            print(f"failed to build books index: {exc}", file=sys.stderr)
+            return 2
+        print(json.dumps(summary, separators=(",", ":")))
+        return 0
+
+    index = Path(args.index) if args.index else sidecar_path_for(books)
+    try:
+        started = time.perf_counter()
+        found = BooksIndex(books, load_books_sidecar(index)).read(args.book_id)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+    except Exception as exc:
+        print(f"failed to read book: {exc}", file=sys.stderr)
+        return 2
+    if found is None:
+        print(json.dumps({"id": args.book_id, "found": False}, separators=(",", ":")))
+        return 1
+    frame_no, row, line = found
+    payload = {
+        "id": args.book_id,
+        "found": True,
+        "frame": frame_no,
+        "row": row,
+        "elapsedMs": elapsed_ms,
+        "book": json.loads(line),
+    }
+    print(json.dumps(payload, separators=(",", ":")))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
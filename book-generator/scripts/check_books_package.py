@@ -4,12 +4,527 @@
 from __future__ import annotations
 
 import argparse
+import base64
+import bisect
 import csv
+import hashlib
 import io
 import json
+import math
+import mmap
+import os
+import queue
+import re
+import shutil
+import struct
+import subprocess
 import sys
+import threading
+import zlib
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable, Iterator
+
+ID_SCAN_MODES = ("fast", "full")
+REQUIRED_BOOK_FIELDS = ("id", "events", "payoutMultiplier")
+# Leading `{"id": <int>` as written by the generators; anything else falls back to json.loads.
+LEADING_ID_RE = re.compile(rb'\s*\{\s*"id"\s*:\s*(-?\d+)\s*[,}]')
+MASK_WINDOW_BITS = 1 << 20
+READ_CHUNK_BYTES = 4 << 20
+READ_AHEAD_CHUNKS = 4
+SIDECAR_SUFFIX = ".idx"
+SIDECAR_VERSION = 1
+SIDECAR_FRAME_FIELDS = ("offset", "compressedSize", "rows", "firstId", "lastId", "ids")
+ZSTD_FRAME_MAGIC = b"\x28\xb5\x2f\xfd"
+WEIGHTS_LOADERS = ("auto", "numpy", "csv")
+WEIGHTS_BLOCK_BYTES = 8 << 20
+WEIGHTS_BLOCK_ROWS = 1 << 20
+MAX_ROW_ERRORS = 10
+# Packed lookup table: header, then an int64 id column, a float64 weight column and
+# (when columns == 3) a float64 payoutMultiplier column, all little-endian.
+LUT_MAGIC = b"BOOKLUT\x00"
+LUT_VERSION = 1
+LUT_HEADER = struct.Struct("<8sIIQQ")
+
+
+class IdSet:
+    """Integer id set sized for tens of millions of ids per mode.
+
+    Ids arriving as one ascending contiguous run (the usual 1..N) are kept as a
+    (lo, hi) pair. Anything else spills to a bitmap, and to a sorted array('q')
+    once the id span is too sparse for a bitmap to be smaller. Duplicates are
+    counted as they are seen; in array mode they are counted by freeze().
+    """
+
+    __slots__ = ("count", "duplicates", "lo", "hi", "base", "bits", "sparse", "ordered")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duplicates = 0
+        self.lo: int | None = None
+        self.hi: int | None = None
+        self.base = 0
+        self.bits: bytearray | None = None
+        self.sparse: array | None = None
+        self.ordered = True
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, value: int) -> bool:
+        if self.sparse is not None:
+            pos = bisect.bisect_left(self.sparse, value)
+            return pos < len(self.sparse) and self.sparse[pos] == value
+        if self.bits is None:
+            return self.hi is not None and self.lo <= value <= self.hi
+        offset = value - self.base
+        if offset < 0 or offset >= len(self.bits) * 8:
+            return False
+        return bool(self.bits[offset >> 3] >> (offset & 7) & 1)
+
+    @staticmethod
+    def bitmap_fits(lo: int, hi: int, count: int) -> bool:
+        # A bitmap costs 1 bit per id in the span, array('q') 64 bits per id.
+        return hi - lo + 1 <= 64 * count + (1 << 23)
+
+    def add(self, value: int) -> None:
+        if self.sparse is not None:
+            if self.ordered and self.sparse and value <= self.sparse[-1]:
+                self.ordered = False
+            self.sparse.append(value)
+            self.count += 1
+            return
+        if self.bits is None:
+            if self.hi is None:
+                self.lo = self.hi = value
+                self.count = 1
+                return
+            if value == self.hi + 1:
+                self.hi = value
+                self.count += 1
+                return
+            if self.lo <= value <= self.hi:
+                self.duplicates += 1
+                return
+        offset = value - self.base
+        if self.bits is None or offset < 0 or offset >= len(self.bits) * 8:
+            lo, hi = self.bounds() or (value, value)
+            self.cover(min(lo, value), max(hi, value))
+            if self.sparse is not None:
+                self.add(value)
+                return
+            offset = value - self.base
+        byte, mask = offset >> 3, 1 << (offset & 7)
+        if self.bits[byte] & mask:
+            self.duplicates += 1
+            return
+        self.bits[byte] |= mask
+        self.count += 1
+
+    def add_range(self, lo: int, hi: int) -> None:
+        if self.bits is None and self.sparse is None and (self.hi is None or lo == self.hi + 1):
+            if self.hi is None:
+                self.lo = lo
+            self.hi = hi
+            self.count += hi - lo + 1
+            return
+        for value in range(lo, hi + 1):
+            self.add(value)
+
+    def add_array(self, values: Any) -> None:
+        """Add a NumPy int64 array; an ascending contiguous block is added as one range."""
+        if len(values) == 0:
+            return
+        first, last = int(values[0]), int(values[-1])
+        if last - first + 1 == len(values) and bool((values[1:] - values[:-1] == 1).all()):
+            self.add_range(first, last)
+            return
+        for value in values.tolist():
+            self.add(value)
+
+    def bounds(self) -> tuple[int, int] | None:
+        if self.count == 0:
+            return None
+        if self.sparse is not None:
+            if self.ordered:
+                return self.sparse[0], self.sparse[-1]
+            return min(self.sparse), max(self.sparse)
+        if self.bits is None:
+            return self.lo, self.hi
+        return self.base, self.base + len(self.bits) * 8 - 1
+
+    def cover(self, lo: int, hi: int, count: int = 0) -> None:
+        """Switch to (or widen) the bitmap so it spans [lo, hi], or go sparse if too wide."""
+        if self.sparse is not None:
+            return
+        old_hi = lo - 1
+        if self.bits is not None:
+            old_hi = self.base + len(self.bits) * 8 - 1
+            if lo >= self.base and hi <= old_hi:
+                return
+            lo, hi = min(lo, self.base), max(hi, old_hi)
+        expected = max(count, self.count + 1)
+        if not self.bitmap_fits(lo, hi, expected):
+            self.to_sparse()
+            return
+        base = lo & ~7
+        if self.bits is not None and hi > old_hi:
+            # Grow geometrically upward so ascending ids do not copy the bitmap each time.
+            grown = self.base + len(self.bits) * 16 - 1
+            if grown > hi and self.bitmap_fits(base, grown, expected):
+                hi = grown
+        bits = bytearray(((hi - base) >> 3) + 1)
+        if self.bits is not None:
+            start = (self.base - base) >> 3
+            bits[start:start + len(self.bits)] = self.bits
+        elif self.hi is not None:
+            fill_bits(bits, self.lo - base, self.hi - base)
+        self.base, self.bits = base, bits
+        self.lo = self.hi = None
+
+    def to_sparse(self) -> None:
+        if self.sparse is not None:
+            return
+        members = array("q")
+        if self.bits is not None:
+            for byte_no, byte in enumerate(self.bits):
+                if byte:
+                    first = self.base + byte_no * 8
+                    members.extend(first + bit for bit in range(8) if byte >> bit & 1)
+        elif self.hi is not None:
+            members.extend(range(self.lo, self.hi + 1))
+        self.sparse, self.bits = members, None
+        self.lo = self.hi = None
+        self.ordered = True
+
+    def freeze(self) -> "IdSet":
+        if self.sparse is not None and not self.ordered:
+            unique = array("q")
+            previous = None
+            for value in sorted(self.sparse):
+                if value == previous:
+                    self.duplicates += 1
+                    self.count -= 1
+                    continue
+                unique.append(value)
+                previous = value
+            self.sparse = unique
+            self.ordered = True
+        return self
+
+    def to_json(self) -> dict[str, Any]:
+        data: dict[str, Any] = {"count": self.count, "duplicates": self.duplicates}
+        if self.sparse is not None:
+            members = array("q", self.sparse)
+            if sys.byteorder == "big":
+                members.byteswap()
+            data["sparse"] = pack_bytes(members.tobytes())
+        elif self.bits is not None:
+            data["base"] = self.base
+            data["bits"] = pack_bytes(bytes(self.bits))
+        elif self.hi is not None:
+            data["lo"], data["hi"] = self.lo, self.hi
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "IdSet":
+        ids = cls()
+        ids.count = int(data["count"])
+        ids.duplicates = int(data["duplicates"])
+        if "sparse" in data:
+            ids.sparse = array("q", unpack_bytes(data["sparse"]))
+            if sys.byteorder == "big":
+                ids.sparse.byteswap()
+        elif "bits" in data:
+            ids.base = int(data["base"])
+            ids.bits = bytearray(unpack_bytes(data["bits"]))
+        elif "hi" in data:
+            ids.lo, ids.hi = int(data["lo"]), int(data["hi"])
+        return ids
+
+    def mask(self, start: int, nbits: int) -> int:
+        """Return an int whose bit i is set when start + i is in the set."""
+        span = self.bounds()
+        if span is None:
+            return 0
+        lo, hi = max(span[0], start), min(span[1], start + nbits - 1)
+        if lo > hi:
+            return 0
+        if self.sparse is not None:
+            result = 0
+            first = bisect.bisect_left(self.sparse, lo)
+            last = bisect.bisect_right(self.sparse, hi)
+            for value in self.sparse[first:last]:
+                result |= 1 << (value - start)
+            return result
+        if self.bits is None:
+            return ((1 << (hi - lo + 1)) - 1) << (lo - start)
+        offset = lo - self.base
+        chunk = int.from_bytes(self.bits[offset >> 3:((hi - self.base) >> 3) + 1], "little")
+        chunk = (chunk >> (offset & 7)) & ((1 << (hi - lo + 1)) - 1)
+        return chunk << (lo - start)
+
+    def missing_from(self, other: "IdSet", limit: int = 10) -> tuple[int, list[int]]:
+        """Count ids in self but not in other and return the smallest `limit` of them."""
+        self.freeze()
+        other.freeze()
+        span = self.bounds()
+        if span is None:
+            return 0, []
+        total = 0
+        sample: list[int] = []
+        if self.sparse is not None:
+            # The span of a sparse set can be huge; walk its members instead of windows.
+            for value in self.sparse:
+                if value not in other:
+                    total += 1
+                    if len(sample) < limit:
+                        sample.append(value)
+            return total, sample
+        for start in range(span[0], span[1] + 1, MASK_WINDOW_BITS):
+            diff = self.mask(start, MASK_WINDOW_BITS) & ~other.mask(start, MASK_WINDOW_BITS)
+            if not diff:
+                continue
+            total += diff.bit_count()
+            while diff and len(sample) < limit:
+                low = diff & -diff
+                sample.append(start + low.bit_length() - 1)
+                diff ^= low
+        return total, sample
+
+    def update(self, other: "IdSet") -> None:
+        """Union other into self; ids present in both count as duplicates."""
+        self.freeze()
+        other.freeze()
+        self.duplicates += other.duplicates
+        theirs_span = other.bounds()
+        if theirs_span is None:
+            return
+        ours_span = self.bounds()
+        if ours_span is None:
+            duplicates = self.duplicates
+            for name in self.__slots__:
+                setattr(self, name, getattr(other, name))
+            self.bits = bytearray(other.bits) if other.bits is not None else None
+            self.sparse = array("q", other.sparse) if other.sparse is not None else None
+            self.duplicates = duplicates
+            return
+        if self.bits is None and self.sparse is None and other.bits is None and other.sparse is None:
+            if other.lo == self.hi + 1:
+                self.hi = other.hi
+                self.count += other.count
+                return
+
+        lo, hi = min(ours_span[0], theirs_span[0]), max(ours_span[1], theirs_span[1])
+        if self.sparse is None and other.sparse is None:
+            self.cover(lo, hi, self.count + other.count)
+        else:
+            self.to_sparse()
+        if self.sparse is None:
+            for start in range(self.base, self.base + len(self.bits) * 8, MASK_WINDOW_BITS):
+                theirs = other.mask(start, MASK_WINDOW_BITS)
+                if not theirs:
+                    continue
+                first = (start - self.base) >> 3
+                nbytes = min(MASK_WINDOW_BITS >> 3, len(self.bits) - first)
+                ours = int.from_bytes(self.bits[first:first + nbytes], "little")
+                overlap = (ours & theirs).bit_count()
+                self.duplicates += overlap
+                self.count += theirs.bit_count() - overlap
+                self.bits[first:first + nbytes] = (ours | theirs).to_bytes(nbytes, "little")
+            return
+
+        other_members = array("q", other.sparse) if other.sparse is not None else None
+        if other_members is None:
+            clone = IdSet()
+            clone.update(other)
+            clone.to_sparse()
+            other_members = clone.sparse
+        self.sparse.extend(other_members)
+        self.count += len(other_members)
+        self.ordered = False
+        self.freeze()
+
+
+class PayoutStats:
+    """Constant-memory weighted payout accumulator fed one lookup row at a time.
+
+    Payouts are bucketed by power of two (bucket e holds [2^(e-1), 2^e)), so the
+    histogram has at most a few dozen entries whatever the book count.
+    """
+
+    __slots__ = (
+        "rows",
+        "total_weight",
+        "weighted_payout",
+        "hit_weight",
+        "max_payout",
+        "zero_weight",
+        "buckets",
+    )
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.total_weight = 0.0
+        self.weighted_payout = 0.0
+        self.hit_weight = 0.0
+        self.max_payout = 0.0
+        self.zero_weight = 0.0
+        self.buckets: dict[int, float] = {}
+
+    def add(self, weight: float, payout: float) -> None:
+        self.rows += 1
+        self.total_weight += weight
+        self.weighted_payout += weight * payout
+        if payout > 0:
+            self.hit_weight += weight
+            if payout > self.max_payout:
+                self.max_payout = payout
+            exponent = math.frexp(payout)[1]
+            self.buckets[exponent] = self.buckets.get(exponent, 0.0) + weight
+        else:
+            self.zero_weight += weight
+
+    def add_arrays(self, np: Any, weights: Any, payouts: Any) -> None:
+        self.rows += len(weights)
+        self.total_weight += float(weights.sum())
+        self.weighted_payout += float(weights @ payouts)
+        hit = payouts > 0
+        self.zero_weight += float(weights[~hit].sum())
+        if not hit.any():
+            return
+        hit_weights, hit_payouts = weights[hit], payouts[hit]
+        self.hit_weight += float(hit_weights.sum())
+        self.max_payout = max(self.max_payout, float(hit_payouts.max()))
+        exponents, slots = np.unique(np.frexp(hit_payouts)[1], return_inverse=True)
+        for exponent, weight in zip(exponents.tolist(), np.bincount(slots, weights=hit_weights).tolist()):
+            self.buckets[exponent] = self.buckets.get(exponent, 0.0) + weight
+
+    def to_json(self) -> dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["buckets"] = {str(exponent): weight for exponent, weight in self.buckets.items()}
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "PayoutStats":
+        stats = cls()
+        for name in cls.__slots__:
+            setattr(stats, name, data[name])
+        stats.buckets = {int(exponent): weight for exponent, weight in data["buckets"].items()}
+        return stats
+
+    def summary(self, cost: float) -> dict[str, Any]:
+        # read_weights reports NaN/inf totals as errors; bare NaN would make the summary invalid JSON.
+        if self.rows == 0 or not (math.isfinite(self.total_weight) and self.total_weight > 0):
+            return {"payoutRows": self.rows, "totalWeight": None, "rtp": None}
+        histogram = [{"lower": 0.0, "upper": 0.0, "probability": self.zero_weight / self.total_weight}]
+        for exponent in sorted(self.buckets):
+            histogram.append(
+                {
+                    "lower": math.ldexp(1.0, exponent - 1),
+                    "upper": math.ldexp(1.0, exponent),
+                    "probability": self.buckets[exponent] / self.total_weight,
+                }
+            )
+        mean_payout = self.weighted_payout / self.total_weight
+        if not math.isfinite(mean_payout):
+            return {"payoutRows": self.rows, "totalWeight": self.total_weight, "rtp": None}
+        return {
+            "payoutRows": self.rows,
+            "totalWeight": self.total_weight,
+            "rtp": mean_payout / cost,
+            "meanPayout": mean_payout,
+            "hitRate": self.hit_weight / self.total_weight,
+            "maxWin": self.max_payout,
+            "payoutHistogram": histogram,
+        }
+
+
+class ResultCache:
+    """On-disk JSON cache of per-file validation results.
+
+    Entries are keyed by resolved path and stamped with size, mtime and SHA-256.
+    A file is only re-hashed when its size is unchanged but its mtime moved; a
+    size change is treated as a content change without reading the file.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.files: dict[str, dict[str, Any]] = {}
+        self.dirty = False
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except Exception:
+            # A corrupt cache only costs a full re-validation.
+            self.dirty = True
+            return
+        if isinstance(data, dict) and data.get("version") == self.VERSION:
+            self.files = data.get("files", {})
+
+    def lookup(self, path: Path, key: str) -> Any:
+        entry = self.files.get(str(path))
+        if entry is None or key not in entry["results"]:
+            return None
+        stat = path.stat()
+        if entry["size"] != stat.st_size:
+            return None
+        if entry["mtimeNs"] != stat.st_mtime_ns:
+            if file_digest(path) != entry["sha256"]:
+                return None
+            entry["mtimeNs"] = stat.st_mtime_ns
+            self.dirty = True
+        return entry["results"][key]
+
+    def store(self, path: Path, key: str, value: Any, digest: str, stat: os.stat_result) -> None:
+        entry = self.files.get(str(path))
+        if entry is None or entry["sha256"] != digest:
+            entry = {"results": {}}
+            self.files[str(path)] = entry
+        entry.update({"size": stat.st_size, "mtimeNs": stat.st_mtime_ns, "sha256": digest})
+        entry["results"][key] = value
+        self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        payload = {"version": self.VERSION, "files": self.files}
+        tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as src:
+        for chunk in iter(lambda: src.read(8 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pack_bytes(data: bytes) -> str:
+    return base64.b64encode(zlib.compress(data, 6)).decode("ascii")
+
+
+def unpack_bytes(text: str) -> bytes:
+    return zlib.decompress(base64.b64decode(text))
+
+
+def fill_bits(bits: bytearray, first: int, last: int) -> None:
+    """Set bit offsets first..last (inclusive) in bits."""
+    while first <= last and first & 7:
+        bits[first >> 3] |= 1 << (first & 7)
+        first += 1
+    while last >= first and (last + 1) & 7:
+        bits[last >> 3] |= 1 << (last & 7)
+        last -= 1
+    if first <= last:
+        bits[first >> 3:(last >> 3) + 1] = b"\xff" * (((last - first) >> 3) + 1)
 
 
 def parse_args() -> argparse.Namespace:
@@ -21,25 +536,178 @@ def parse_args() -> argparse.Namespace:
         default=0,
         help="Optional per-mode cap on book rows to read (0 = full file)",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for concurrent mode validation (0 = CPU count)",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=0,
+        help="Byte-range shards per uncompressed books file (0 = match --jobs)",
+    )
+    parser.add_argument(
+        "--id-scan",
+        choices=ID_SCAN_MODES,
+        default="fast",
+        help="fast: read id and top-level keys without decoding events; full: json.loads every row",
+    )
+    parser.add_argument(
+        "--payout-scale",
+        type=float,
+        default=1.0,
+        help="Divisor applied to lookup payoutMultiplier values (e.g. 100 for integer-cent tables)",
+    )
+    parser.add_argument(
+        "--weights-loader",
+        choices=WEIGHTS_LOADERS,
+        default="auto",
+        help="Lookup table parser: numpy (columnar, needs NumPy), csv (per row), auto (numpy if installed)",
+    )
+    parser.add_argument(
+        "--cache",
+        help="JSON cache of per-file results; files whose size/mtime/content are unchanged are skipped",
+    )
     return parser.parse_args()
 
 
-def iter_lines(path: Path) -> Iterable[str]:
-    if path.suffix == ".zst":
+def iter_zstd_chunks(path: Path, chunk_size: int) -> Iterator[bytes]:
+    """Decompress on a background thread so inflation overlaps line parsing.
+
+    Uses the zstandard package when installed, else a `zstd -dc` subprocess.
+    """
+    try:
+        import zstandard as zstd
+    except Exception as exc:
+        zstd = None
+        if shutil.which("zstd") is None:
+            raise RuntimeError(f"zstd file requires zstandard package or zstd CLI: {exc}") from exc
+
+    if zstd is None:
+        with subprocess.Popen(["zstd", "-dc", "--", str(path)], stdout=subprocess.PIPE) as proc:
+            try:
+                yield from iter(lambda: proc.stdout.read(chunk_size), b"")
+            except GeneratorExit:
+                proc.kill()
+                raise
+            if proc.wait() != 0:
+                raise RuntimeError(f"zstd -dc failed for {path} (exit {proc.returncode})")
+        return
+
+    chunks: queue.Queue = queue.Queue(maxsize=READ_AHEAD_CHUNKS)
+    stop = threading.Event()
+
+    def put(item: Any) -> None:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce() -> None:
         try:
-            import zstandard as zstd
-        except Exception as exc:
-            raise RuntimeError(f"zstd file requires zstandard package: {exc}") from exc
-        with path.open("rb") as src:
-            dctx = zstd.ZstdDecompressor()
-            with dctx.stream_reader(src) as reader:
-                wrapper = io.TextIOWrapper(reader, encoding="utf-8")
-                for line in wrapper:
-                    yield line
+            with path.open("rb") as src:
+                dctx = zstd.ZstdDecompressor()
+                with dctx.stream_reader(src, read_size=chunk_size, read_across_frames=True) as reader:
+                    while not stop.is_set():
+                        chunk = reader.read(chunk_size)
+                        if not chunk:
+                            break
+                        put(chunk)
+        except BaseException as exc:
+            put(exc)
+        finally:
+            put(None)
+
+    thread = threading.Thread(target=produce, name=f"zstd-{path.name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise RuntimeError(f"zstd decompression failed for {path}: {item}") from item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class ChunkStream(io.RawIOBase):
+    """Raw readable stream over an iterator of byte chunks, for wrapping in BufferedReader."""
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        super().__init__()
+        self.chunks = chunks
+        self.pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = memoryview(chunk)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self) -> None:
+        close_chunks = getattr(self.chunks, "close", None)
+        if close_chunks is not None:
+            close_chunks()
+        super().close()
+
+
+def iter_lines(path: Path) -> Iterator[bytes]:
+    """Yield raw newline-terminated lines from a plain or .zst file.
+
+    Lines stay as bytes (json.loads accepts them) and are split by the C
+    BufferedReader over READ_CHUNK_BYTES buffers instead of a TextIOWrapper.
+    """
+    if path.suffix == ".zst":
+        stream = io.BufferedReader(ChunkStream(iter_zstd_chunks(path, READ_CHUNK_BYTES)), READ_CHUNK_BYTES)
     else:
-        with path.open("r", encoding="utf-8") as src:
-            for line in src:
-                yield line
+        stream = path.open("rb", buffering=READ_CHUNK_BYTES)
+    with stream:
+        yield from stream
+
+
+def iter_line_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with path.open("rb", buffering=READ_CHUNK_BYTES) as src:
+        src.seek(start)
+        pos = start
+        while pos < end:
+            raw = src.readline()
+            if not raw:
+                break
+            pos += len(raw)
+            yield raw
+
+
+def split_byte_ranges(path: Path, shards: int) -> list[tuple[int, int]]:
+    size = path.stat().st_size
+    if shards <= 1 or size == 0:
+        return [(0, size)]
+
+    bounds = [0]
+    with path.open("rb") as src:
+        for i in range(1, shards):
+            src.seek(size * i // shards)
+            src.readline()
+            pos = min(src.tell(), size)
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    if bounds[-1] < size:
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
 
 
 def parse_int(value: Any, field: str) -> int:
@@ -56,48 +724,187 @@ def parse_float(value: Any, field: str) -> float:
     return float(text)
 
 
-def read_book_ids(path: Path, max_rows: int) -> tuple[set[int], int, bool, list[str]]:
-    ids: set[int] = set()
-    duplicates = 0
+def parse_book_full(line: bytes) -> tuple[int | None, list[str]]:
+    try:
+        row = json.loads(line)
+    except Exception as exc:
+        return None, [f"invalid JSON ({exc})"]
+    if not isinstance(row, dict):
+        return None, ["invalid JSON (row is not an object)"]
+
+    problems = [f"missing field '{key}'" for key in REQUIRED_BOOK_FIELDS if key not in row]
+    if "id" not in row:
+        return None, problems
+    try:
+        return parse_int(row["id"], "id"), problems
+    except Exception as exc:
+        problems.append(f"invalid id ({exc})")
+        return None, problems
+
+
+def parse_book_fast(line: bytes) -> tuple[int | None, list[str]]:
+    match = LEADING_ID_RE.match(line)
+    if match is None:
+        return parse_book_full(line)
+    if not line.rstrip().endswith(b"}"):
+        return None, ["invalid JSON (truncated object)"]
+
+    # Key presence is a substring check; nested keys with the same name are not told apart.
+    problems = [
+        f"missing field '{key}'" for key in ("events", "payoutMultiplier") if b'"%s"' % key.encode() not in line
+    ]
+    return int(match.group(1)), problems
+
+
+def scan_book_lines(
+    lines: Iterable[bytes], max_rows: int, id_scan: str = "full"
+) -> tuple[IdSet, int, bool, list[tuple[int, str]]]:
+    parse_book = parse_book_fast if id_scan == "fast" else parse_book_full
+    ids = IdSet()
+    line_count = 0
     truncated = False
-    errors: list[str] = []
+    line_errors: list[tuple[int, str]] = []
 
-    for line_no, line in enumerate(iter_lines(path), start=1):
+    for line_no, line in enumerate(lines, start=1):
+        line_count = line_no
         if not line.strip():
             continue
         if max_rows > 0 and len(ids) >= max_rows:
             truncated = True
             break
-        try:
-            row = json.loads(line)
-        except Exception as exc:
-            errors.append(f"books line {line_no}: invalid JSON ({exc})")
+
+        book_id, problems = parse_book(line)
+        for detail in problems:
+            line_errors.append((line_no, detail))
+        if book_id is None:
             continue
 
-        for key in ("id", "events", "payoutMultiplier"):
-            if key not in row:
-                errors.append(f"books line {line_no}: missing field '{key}'")
+        ids.add(book_id)
 
-        if "id" not in row:
-            continue
+    return ids.freeze(), line_count, truncated, line_errors
+
+
+def read_book_shard(
+    path: Path,
+    max_rows: int = 0,
+    start: int = 0,
+    end: int | None = None,
+    id_scan: str = "full",
+) -> tuple[IdSet, int, bool, list[tuple[int, str]]]:
+    if end is None:
+        return scan_book_lines(iter_lines(path), max_rows, id_scan)
+    return scan_book_lines(iter_line_range(path, start, end), max_rows, id_scan)
+
+
+def combine_book_shards(
+    shards: list[tuple[IdSet, int, bool, list[tuple[int, str]]]]
+) -> tuple[IdSet, int, bool, list[tuple[int, str]]]:
+    ids = IdSet()
+    truncated = False
+    line_errors: list[tuple[int, str]] = []
+    line_offset = 0
+
+    for shard_ids, line_count, shard_truncated, shard_errors in shards:
+        line_errors.extend((line_offset + line_no, detail) for line_no, detail in shard_errors)
+        line_offset += line_count
+        truncated = truncated or shard_truncated
+        ids.update(shard_ids)
+    return ids, line_offset, truncated, line_errors
+
+
+def merge_book_shards(
+    shards: list[tuple[IdSet, int, bool, list[tuple[int, str]]]]
+) -> tuple[IdSet, int, bool, list[str]]:
+    ids, _, truncated, line_errors = combine_book_shards(shards)
+    errors = [f"books line {line_no}: {detail}" for line_no, detail in line_errors]
+    if ids.duplicates > 0:
+        errors.append(f"books duplicate id count: {ids.duplicates}")
+    return ids, len(ids), truncated, errors
+
+
+def read_book_ids(
+    path: Path, max_rows: int, id_scan: str = "full"
+) -> tuple[IdSet, int, bool, list[str]]:
+    return merge_book_shards([read_book_shard(path, max_rows, id_scan=id_scan)])
+
+
+def add_weight_row(
+    row_no: int,
+    row: list[str],
+    ids: IdSet,
+    stats: PayoutStats,
+    errors: list[str],
+    payout_scale: float,
+) -> None:
+    if len(row) < 2:
+        errors.append(f"weights row {row_no}: expected at least 2 columns")
+        return
+    try:
+        book_id = parse_int(row[0], "id")
+        weight = parse_float(row[1], "weight")
+    except Exception as exc:
+        errors.append(f"weights row {row_no}: parse error ({exc})")
+        return
+    payout = None
+    payout_error = None
+    if len(row) > 2:
         try:
-            book_id = parse_int(row["id"], "id")
+            payout = parse_float(row[2], "payoutMultiplier") / payout_scale
         except Exception as exc:
-            errors.append(f"books line {line_no}: invalid id ({exc})")
-            continue
+            payout_error = f"weights row {row_no}: parse error ({exc})"
+    add_weight_values(row_no, book_id, weight, payout, ids, stats, errors)
+    if payout_error is not None:
+        errors.append(payout_error)
 
-        if book_id in ids:
-            duplicates += 1
-        ids.add(book_id)
 
-    if duplicates > 0:
-        errors.append(f"books duplicate id count: {duplicates}")
-    return ids, len(ids), truncated, errors
+def add_weight_values(
+    row_no: int,
+    book_id: int,
+    weight: float,
+    payout: float | None,
+    ids: IdSet,
+    stats: PayoutStats,
+    errors: list[str],
+) -> None:
+    if not math.isfinite(weight):
+        errors.append(f"weights row {row_no}: non-finite weight {weight}")
+    elif weight <= 0:
+        errors.append(f"weights row {row_no}: non-positive weight {weight}")
+    ids.add(book_id)
+    if payout is not None:
+        stats.add(weight, payout)
+
+
+def check_weight_block(
+    np: Any,
+    block_ids: Any,
+    weights: Any,
+    payouts: Any,
+    first_row: int,
+    ids: IdSet,
+    stats: PayoutStats,
+    errors: list[str],
+    invalid_weights: int,
+) -> int:
+    """Array form of add_weight_values; returns the running invalid-weight count."""
+    invalid = np.flatnonzero(~(weights > 0) | ~np.isfinite(weights))
+    for index in invalid[: max(0, MAX_ROW_ERRORS - invalid_weights)].tolist():
+        weight = float(weights[index])
+        kind = "non-positive" if math.isfinite(weight) else "non-finite"
+        errors.append(f"weights row {first_row + index}: {kind} weight {weight}")
+    ids.add_array(block_ids)
+    if payouts is not None:
+        stats.add_arrays(np, weights, payouts)
+    return invalid_weights + len(invalid)
 
 
-def read_weights(path: Path) -> tuple[set[int], int, list[str]]:
-    ids: set[int] = set()
-    duplicates = 0
+def is_weights_header(row: list[str]) -> bool:
+    return bool(row) and row[0].strip().lower() in {"id", "book_id"}
+
+
+def read_weights_csv(path: Path, payout_scale: float) -> tuple[IdSet, list[str], PayoutStats]:
+    ids = IdSet()
+    stats = PayoutStats()
     errors: list[str] = []
 
     with path.open("r", encoding="utf-8", newline="") as src:
@@ -105,29 +912,338 @@ def read_weights(path: Path) -> tuple[set[int], int, list[str]]:
         for row_no, row in enumerate(reader, start=1):
             if not row:
                 continue
-            if row_no == 1 and row[0].strip().lower() in {"id", "book_id"}:
-                continue
-            if len(row) < 2:
-                errors.append(f"weights row {row_no}: expected at least 2 columns")
+            if row_no == 1 and is_weights_header(row):
                 continue
+            add_weight_row(row_no, row, ids, stats, errors, payout_scale)
+    return ids, errors, stats
+
+
+def read_weights_columnar(path: Path, payout_scale: float, np: Any) -> tuple[IdSet, list[str], PayoutStats]:
+    """Parse the lookup table in ~8 MiB blocks of int64 id / float64 weight / payout columns.
+
+    A block that NumPy cannot parse cleanly (quoted cells, blank lines, bad
+    values) is re-read row by row so the first bad rows keep their messages.
+    """
+    ids = IdSet()
+    stats = PayoutStats()
+    errors: list[str] = []
+    invalid_weights = 0
+    row_no = 0
+    dtype = None
+
+    def parse_block(block: bytes) -> None:
+        nonlocal invalid_weights, row_no, dtype
+        first_row = row_no + 1
+        row_no += block.count(b"\n")
+        if first_row == 1:
+            head = next(csv.reader([block.split(b"\n", 1)[0].decode("utf-8")]), [])
+            if is_weights_header(head):
+                block = block.split(b"\n", 1)[1]
+                first_row = 2
+            columns = min(len(head), 3)
+            fields = [("id", "<i8"), ("weight", "<f8"), ("payout", "<f8")][:columns]
+            dtype = np.dtype(fields) if columns >= 2 else None
+        if not block:
+            return
+
+        table = None
+        if dtype is not None:
             try:
-                book_id = parse_int(row[0], "id")
-                weight = parse_float(row[1], "weight")
-            except Exception as exc:
-                errors.append(f"weights row {row_no}: parse error ({exc})")
+                table = np.loadtxt(
+                    io.BytesIO(block),
+                    delimiter=",",
+                    dtype=dtype,
+                    usecols=range(len(dtype.names)),
+                    ndmin=1,
+                )
+            except ValueError:
+                table = None
+        if table is None or len(table) != row_no - first_row + 1:
+            text = block.decode("utf-8")
+            for offset, row in enumerate(csv.reader(io.StringIO(text, newline=""))):
+                if row:
+                    add_weight_row(first_row + offset, row, ids, stats, errors, payout_scale)
+            return
+
+        payouts = table["payout"] / payout_scale if "payout" in dtype.names else None
+        invalid_weights = check_weight_block(
+            np, table["id"], table["weight"], payouts, first_row, ids, stats, errors, invalid_weights
+        )
+
+    with path.open("rb") as src:
+        pending = b""
+        for chunk in iter(lambda: src.read(WEIGHTS_BLOCK_BYTES), b""):
+            chunk = pending + chunk
+            cut = chunk.rfind(b"\n") + 1
+            chunk, pending = chunk[:cut], chunk[cut:]
+            if chunk:
+                parse_block(chunk)
+        if pending:
+            parse_block(pending + b"\n")
+
+    if invalid_weights > MAX_ROW_ERRORS:
+        errors.append(f"weights invalid weight count: {invalid_weights} (showing first {MAX_ROW_ERRORS})")
+    return ids, errors, stats
+
+
+def is_lookup_binary(path: Path) -> bool:
+    with path.open("rb") as src:
+        return src.read(len(LUT_MAGIC)) == LUT_MAGIC
+
+
+def read_weights_binary(path: Path, payout_scale: float, np: Any) -> tuple[IdSet, list[str], PayoutStats]:
+    """Validate a packed lookup table in place through a read-only memory map."""
+    ids = IdSet()
+    stats = PayoutStats()
+    errors: list[str] = []
+    size = path.stat().st_size
+    if size < LUT_HEADER.size:
+        return ids, [f"weights binary header truncated ({size} bytes)"], stats
+
+    with path.open("rb") as src, mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        magic, version, columns, rows, _ = LUT_HEADER.unpack_from(mapped, 0)
+        if version != LUT_VERSION or columns not in (2, 3):
+            return ids, [f"weights binary unsupported version {version} / columns {columns}"], stats
+        if size != LUT_HEADER.size + rows * 8 * columns:
+            return ids, [f"weights binary size {size} does not match {rows} rows x {columns} columns"], stats
+
+        offsets = [LUT_HEADER.size + rows * 8 * column for column in range(columns)]
+        if np is not None:
+            invalid_weights = 0
+            for start in range(0, rows, WEIGHTS_BLOCK_ROWS):
+                count = min(WEIGHTS_BLOCK_ROWS, rows - start)
+                block_ids = np.frombuffer(mapped, "<i8", count, offsets[0] + start * 8)
+                weights = np.frombuffer(mapped, "<f8", count, offsets[1] + start * 8)
+                payouts = None
+                if columns == 3:
+                    payouts = np.frombuffer(mapped, "<f8", count, offsets[2] + start * 8) / payout_scale
+                invalid_weights = check_weight_block(
+                    np, block_ids, weights, payouts, start + 1, ids, stats, errors, invalid_weights
+                )
+                del block_ids, weights, payouts
+            if invalid_weights > MAX_ROW_ERRORS:
+                errors.append(
+                    f"weights invalid weight count: {invalid_weights} (showing first {MAX_ROW_ERRORS})"
+                )
+            return ids, errors, stats
+
+        if sys.byteorder == "big":
+            raise RuntimeError("reading packed lookup tables without NumPy needs a little-endian host")
+        with memoryview(mapped) as view:
+            id_column = view[offsets[0]:offsets[0] + rows * 8].cast("q")
+            weight_column = view[offsets[1]:offsets[1] + rows * 8].cast("d")
+            payout_column = view[offsets[2]:].cast("d") if columns == 3 else None
+            for index in range(rows):
+                payout = payout_column[index] / payout_scale if payout_column is not None else None
+                add_weight_values(
+                    index + 1, id_column[index], weight_column[index], payout, ids, stats, errors
+                )
+            for column in (id_column, weight_column, payout_column):
+                if column is not None:
+                    column.release()
+    return ids, errors, stats
+
+
+def load_numpy() -> Any:
+    try:
+        import numpy as np
+    except Exception:
+        return None
+    return np
+
+
+def read_weights(
+    path: Path, payout_scale: float = 1.0, loader: str = "csv"
+) -> tuple[IdSet, int, list[str], PayoutStats]:
+    np = load_numpy() if loader in ("auto", "numpy") else None
+    if loader == "numpy" and np is None:
+        raise RuntimeError("--weights-loader numpy requires the numpy package")
+    if is_lookup_binary(path):
+        ids, errors, stats = read_weights_binary(path, payout_scale, load_numpy() if loader != "csv" else None)
+    elif np is not None:
+        ids, errors, stats = read_weights_columnar(path, payout_scale, np)
+    else:
+        ids, errors, stats = read_weights_csv(path, payout_scale)
+
+    ids.freeze()
+    if ids.duplicates > 0:
+        errors.append(f"weights duplicate id count: {ids.duplicates}")
+    if stats.rows and not (math.isfinite(stats.total_weight) and stats.total_weight > 0):
+        errors.append(f"weights total weight must be finite and > 0, got {stats.total_weight}")
+    return ids, len(ids), errors, stats
+
+
+def read_weight_columns(path: Path, payout_scale: float = 1.0, np: Any = None) -> tuple[Any, Any, Any]:
+    """Load (ids, weights, payouts) columns for samplers; payouts is None for 2-column tables.
+
+    Columns are NumPy arrays when ``np`` is given, else array('q') / array('d').
+    Values are not validated here; run read_weights for the package checks.
+    """
+    if is_lookup_binary(path):
+        with path.open("rb") as src:
+            _, version, columns, rows, _ = LUT_HEADER.unpack(src.read(LUT_HEADER.size))
+            if version != LUT_VERSION or columns not in (2, 3):
+                raise ValueError(f"weights binary unsupported version {version} / columns {columns}")
+            size = path.stat().st_size
+            if size != LUT_HEADER.size + rows * 8 * columns:
+                raise ValueError(f"weights binary size {size} does not match {rows} rows x {columns} columns")
+            loaded = []
+            for typecode in ("q", "d", "d")[:columns]:
+                if np is not None:
+                    loaded.append(np.fromfile(src, "<i8" if typecode == "q" else "<f8", rows))
+                    continue
+                column = array(typecode)
+                column.fromfile(src, rows)
+                if sys.byteorder == "big":
+                    column.byteswap()
+                loaded.append(column)
+        ids, weights = loaded[0], loaded[1]
+        payouts = loaded[2] if columns == 3 else None
+    else:
+        ids, weights, payouts = array("q"), array("d"), array("d")
+        columns = None
+        with path.open("r", encoding="utf-8", newline="") as src:
+            for row_no, row in enumerate(csv.reader(src), start=1):
+                if not row or (row_no == 1 and is_weights_header(row)):
+                    continue
+                if len(row) < 2:
+                    raise ValueError(f"weights row {row_no}: expected at least 2 columns")
+                if columns is None:
+                    columns = min(len(row), 3)
+                elif min(len(row), 3) != columns:
+                    raise ValueError(f"weights row {row_no}: column count changed")
+                try:
+                    ids.append(parse_int(row[0], "id"))
+                    weights.append(parse_float(row[1], "weight"))
+                    if columns == 3:
+                        payouts.append(parse_float(row[2], "payoutMultiplier"))
+                except ValueError as exc:
+                    raise ValueError(f"weights row {row_no}: {exc}") from exc
+        if columns != 3:
+            payouts = None
+        if np is not None:
+            ids = np.frombuffer(ids, dtype=np.int64) if ids else np.zeros(0, dtype=np.int64)
+            weights = np.frombuffer(weights, dtype=np.float64) if weights else np.zeros(0)
+            if payouts is not None:
+                payouts = np.frombuffer(payouts, dtype=np.float64)
+
+    if payouts is not None and payout_scale != 1.0:
+        if np is not None:
+            payouts = payouts / payout_scale
+        else:
+            payouts = array("d", (payout / payout_scale for payout in payouts))
+    return ids, weights, payouts
+
+
+def encode_books(value: tuple[IdSet, int, bool, list[tuple[int, str]]]) -> dict[str, Any]:
+    ids, line_count, truncated, line_errors = value
+    return {"ids": ids.to_json(), "lines": line_count, "truncated": truncated, "lineErrors": line_errors}
+
+
+def decode_books(data: dict[str, Any]) -> tuple[IdSet, int, bool, list[tuple[int, str]]]:
+    line_errors = [(int(line_no), str(detail)) for line_no, detail in data["lineErrors"]]
+    return IdSet.from_json(data["ids"]), int(data["lines"]), bool(data["truncated"]), line_errors
+
+
+def encode_weights(value: tuple[IdSet, int, list[str], PayoutStats]) -> dict[str, Any]:
+    ids, count, errors, stats = value
+    return {"ids": ids.to_json(), "count": count, "errors": errors, "stats": stats.to_json()}
+
+
+def decode_weights(data: dict[str, Any]) -> tuple[IdSet, int, list[str], PayoutStats]:
+    stats = PayoutStats.from_json(data["stats"])
+    return IdSet.from_json(data["ids"]), int(data["count"]), list(data["errors"]), stats
+
+
+def sidecar_path_for(events_path: Path) -> Path:
+    return events_path.with_name(events_path.name + SIDECAR_SUFFIX)
+
+
+def load_books_sidecar(path: Path) -> dict[str, Any]:
+    """Load a books random-access index written by books_index.py build.
+
+    Each frame row is (offset, compressedSize, rows, firstId, lastId, ids):
+    ids is null when the frame holds the contiguous ids firstId..lastId in
+    order, else a packed array('q') of the frame's ids in row order.
+    """
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict) or data.get("version") != SIDECAR_VERSION:
+        raise ValueError(f"{path}: unsupported books index version")
+    if data.get("frameFields") != list(SIDECAR_FRAME_FIELDS) or not isinstance(data.get("frames"), list):
+        raise ValueError(f"{path}: malformed books index")
+    return data
+
+
+def frame_ids(frame: list[Any]) -> array:
+    ids = array("q", unpack_bytes(frame[5]))
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids
+
+
+def verify_books_sidecar(sidecar_path: Path, events_path: Path) -> tuple[IdSet, int, list[str]]:
+    errors: list[str] = []
+    try:
+        sidecar = load_books_sidecar(sidecar_path)
+    except Exception as exc:
+        return IdSet(), 0, [f"books index unreadable: {exc}"]
+
+    size = events_path.stat().st_size
+    if sidecar.get("booksSize") != size:
+        errors.append(f"books index size {sidecar.get('booksSize')} != books file size {size}")
+
+    ids = IdSet()
+    rows = 0
+    expected_offset = 0
+    with events_path.open("rb") as src:
+        for frame_no, frame in enumerate(sidecar["frames"]):
+            offset, compressed_size, frame_rows, first_id, last_id, packed = frame
+            if offset != expected_offset:
+                errors.append(f"books index frame {frame_no}: offset {offset} != expected {expected_offset}")
+                break
+            src.seek(offset)
+            if src.read(4) != ZSTD_FRAME_MAGIC:
+                errors.append(f"books index frame {frame_no}: no zstd frame at offset {offset}")
+                break
+            expected_offset = offset + compressed_size
+            rows += frame_rows
+            if packed is None:
+                if last_id - first_id + 1 != frame_rows:
+                    errors.append(f"books index frame {frame_no}: id range does not match row count")
+                ids.add_range(first_id, last_id)
                 continue
-            if weight <= 0:
-                errors.append(f"weights row {row_no}: non-positive weight {weight}")
-            if book_id in ids:
-                duplicates += 1
-            ids.add(book_id)
+            members = frame_ids(frame)
+            if len(members) != frame_rows:
+                errors.append(f"books index frame {frame_no}: id list does not match row count")
+            for book_id in members:
+                ids.add(book_id)
+
+    if not errors and expected_offset + int(sidecar.get("seekTableBytes", 0)) != size:
+        errors.append(f"books index frames end at {expected_offset}, books file is {size} bytes")
+    return ids.freeze(), rows, errors
+
 
-    if duplicates > 0:
-        errors.append(f"weights duplicate id count: {duplicates}")
-    return ids, len(ids), errors
+def submit(executor: ProcessPoolExecutor | None, fn: Callable[..., Any], *args: Any) -> Any:
+    if executor is None:
+        return fn(*args)
+    return executor.submit(fn, *args)
 
 
-def validate_mode(index_dir: Path, mode: dict[str, Any], max_rows: int) -> dict[str, Any]:
+def resolve(value: Any) -> Any:
+    return value.result() if isinstance(value, Future) else value
+
+
+def start_mode(
+    index_dir: Path,
+    mode: dict[str, Any],
+    max_rows: int,
+    executor: ProcessPoolExecutor | None = None,
+    shards: int = 1,
+    id_scan: str = "full",
+    payout_scale: float = 1.0,
+    cache: ResultCache | None = None,
+    weights_loader: str = "csv",
+) -> tuple[dict[str, Any], dict[str, Any]]:
     result: dict[str, Any] = {"name": mode.get("name", "<unknown>"), "errors": []}
     required_keys = ("name", "cost", "events", "weights")
     for key in required_keys:
@@ -135,7 +1251,18 @@ def validate_mode(index_dir: Path, mode: dict[str, Any], max_rows: int) -> dict[
             result["errors"].append(f"mode missing key '{key}'")
     if result["errors"]:
         result["passed"] = False
-        return result
+        return result, {}
+
+    try:
+        cost = parse_float(mode["cost"], "cost")
+    except Exception as exc:
+        cost = 0.0
+        result["errors"].append(f"mode cost invalid ({exc})")
+    if cost <= 0 and not result["errors"]:
+        result["errors"].append(f"mode cost must be > 0, got {cost}")
+    if result["errors"]:
+        result["passed"] = False
+        return result, {}
 
     events_path = (index_dir / str(mode["events"])).resolve()
     weights_path = (index_dir / str(mode["weights"])).resolve()
@@ -148,40 +1275,143 @@ def validate_mode(index_dir: Path, mode: dict[str, Any], max_rows: int) -> dict[
         result["errors"].append(f"weights file not found: {weights_path}")
     if result["errors"]:
         result["passed"] = False
+        return result, {}
+
+    books_key = f"books:{id_scan}:{max_rows}"
+    weights_key = f"weights:{payout_scale!r}"
+    pending: dict[str, Any] = {"cost": cost, "cache": cache, "store": []}
+    if cache is not None:
+        result["cacheHits"] = []
+
+    cached = cache.lookup(events_path, books_key) if cache is not None else None
+    if cached is not None:
+        books = [decode_books(cached)]
+        result["cacheHits"].append("events")
+    elif shards > 1 and max_rows == 0 and events_path.suffix != ".zst":
+        # Byte-range sharding needs random access, so only plain JSONL without a row cap qualifies.
+        ranges = split_byte_ranges(events_path, shards)
+        books = [submit(executor, read_book_shard, events_path, 0, s, e, id_scan) for s, e in ranges]
+    else:
+        books = [submit(executor, read_book_shard, events_path, max_rows, 0, None, id_scan)]
+    if cache is not None and cached is None:
+        stat = events_path.stat()
+        digest = submit(executor, file_digest, events_path)
+        pending["store"].append(("books", events_path, books_key, stat, digest))
+    result["bookShards"] = len(books)
+    pending["books"] = books
+
+    sidecar_path = (index_dir / str(mode["eventsIndex"])).resolve() if "eventsIndex" in mode else None
+    if sidecar_path is None and sidecar_path_for(events_path).exists():
+        sidecar_path = sidecar_path_for(events_path)
+    if sidecar_path is not None:
+        result["eventsIndexPath"] = str(sidecar_path)
+        if sidecar_path.exists():
+            pending["sidecar"] = submit(executor, verify_books_sidecar, sidecar_path, events_path)
+        else:
+            result["errors"].append(f"events index file not found: {sidecar_path}")
+
+    cached = cache.lookup(weights_path, weights_key) if cache is not None else None
+    if cached is not None:
+        pending["weights"] = decode_weights(cached)
+        result["cacheHits"].append("weights")
+    else:
+        if cache is not None:
+            stat = weights_path.stat()
+            digest = submit(executor, file_digest, weights_path)
+            pending["store"].append(("weights", weights_path, weights_key, stat, digest))
+        pending["weights"] = submit(executor, read_weights, weights_path, payout_scale, weights_loader)
+    return result, pending
+
+
+def finish_mode(result: dict[str, Any], pending: dict[str, Any]) -> dict[str, Any]:
+    if not pending:
         return result
 
-    book_ids, book_count, truncated, book_errors = read_book_ids(events_path, max_rows)
-    weight_ids, weight_count, weight_errors = read_weights(weights_path)
+    books = combine_book_shards([resolve(shard) for shard in pending["books"]])
+    weights = resolve(pending["weights"])
+    for kind, path, key, stat, digest in pending["store"]:
+        value = encode_books(books) if kind == "books" else encode_weights(weights)
+        pending["cache"].store(path, key, value, resolve(digest), stat)
+
+    book_ids, book_count, truncated, book_errors = merge_book_shards([books])
+    weight_ids, weight_count, weight_errors, payout_stats = weights
+    if "sidecar" in pending:
+        index_ids, index_rows, index_errors = resolve(pending["sidecar"])
+        result["errors"].extend(index_errors)
+        if not truncated and not index_errors:
+            if index_rows != book_count + book_ids.duplicates:
+                result["errors"].append(
+                    f"books index rows {index_rows} != books rows {book_count + book_ids.duplicates}"
+                )
+            unindexed_count, unindexed = book_ids.missing_from(index_ids)
+            stale_count, stale = index_ids.missing_from(book_ids)
+            if unindexed_count:
+                result["errors"].append(
+                    f"books index missing {unindexed_count} book ids (showing up to 10): {unindexed}"
+                )
+            if stale_count:
+                result["errors"].append(
+                    f"books index references {stale_count} unknown ids (showing up to 10): {stale}"
+                )
     result["bookRowsRead"] = book_count
     result["weightRowsRead"] = weight_count
+    result["distribution"] = payout_stats.summary(pending["cost"])
     result["truncated"] = truncated
     result["errors"].extend(book_errors)
     result["errors"].extend(weight_errors)
 
     if truncated:
-        missing_sample_ids = sorted(book_ids - weight_ids)
-        if missing_sample_ids:
+        missing_count, missing_sample_ids = book_ids.missing_from(weight_ids)
+        if missing_count:
             result["errors"].append(
-                f"lookup missing sampled book ids (showing up to 10): {missing_sample_ids[:10]}"
+                f"lookup missing {missing_count} sampled book ids (showing up to 10): {missing_sample_ids}"
             )
     else:
-        missing_in_weights = sorted(book_ids - weight_ids)
-        missing_in_books = sorted(weight_ids - book_ids)
-        if missing_in_weights:
+        missing_count, missing_in_weights = book_ids.missing_from(weight_ids)
+        unknown_count, missing_in_books = weight_ids.missing_from(book_ids)
+        if missing_count:
             result["errors"].append(
-                f"lookup missing book ids (showing up to 10): {missing_in_weights[:10]}"
+                f"lookup missing {missing_count} book ids (showing up to 10): {missing_in_weights}"
             )
-        if missing_in_books:
+        if unknown_count:
             result["errors"].append(
-                f"lookup references unknown ids (showing up to 10): {missing_in_books[:10]}"
+                f"lookup references {unknown_count} unknown ids (showing up to 10): {missing_in_books}"
             )
 
     result["passed"] = len(result["errors"]) == 0
     return result
 
 
+def validate_mode(
+    index_dir: Path,
+    mode: dict[str, Any],
+    max_rows: int,
+    id_scan: str = "full",
+    payout_scale: float = 1.0,
+    cache: ResultCache | None = None,
+    weights_loader: str = "csv",
+) -> dict[str, Any]:
+    return finish_mode(
+        *start_mode(
+            index_dir,
+            mode,
+            max_rows,
+            id_scan=id_scan,
+            payout_scale=payout_scale,
+            cache=cache,
+            weights_loader=weights_loader,
+        )
+    )
+
+
 def main() -> int:
     args = parse_args()
+    if args.payout_scale <= 0:
+        print("--payout-scale must be > 0", file=sys.stderr)
+        return 2
+    if args.weights_loader == "numpy" and load_numpy() is None:
+        print("--weights-loader numpy requires the numpy package", file=sys.stderr)
+        return 2
     index_path = Path(args.index)
     if not index_path.exists():
         print(f"index not found: {index_path}", file=sys.stderr)
@@ -198,12 +1428,37 @@ def main() -> int:
         print("index must contain non-empty 'modes' array", file=sys.stderr)
         return 2
 
-    mode_results = []
-    for mode in modes:
-        if not isinstance(mode, dict):
-            mode_results.append({"name": "<invalid>", "passed": False, "errors": ["mode is not object"]})
-            continue
-        mode_results.append(validate_mode(index_path.parent, mode, args.max_rows))
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    shards = args.shards if args.shards > 0 else jobs
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    cache = ResultCache(Path(args.cache)) if args.cache else None
+
+    # Submit every mode before collecting any, so books shards and lookup tables overlap.
+    started: list[tuple[dict[str, Any], dict[str, Any]]] = []
+    try:
+        for mode in modes:
+            if not isinstance(mode, dict):
+                started.append(({"name": "<invalid>", "passed": False, "errors": ["mode is not object"]}, {}))
+                continue
+            started.append(
+                start_mode(
+                    index_path.parent,
+                    mode,
+                    args.max_rows,
+                    executor,
+                    shards,
+                    args.id_scan,
+                    args.payout_scale,
+                    cache,
+                    args.weights_loader,
+                )
+            )
+        mode_results = [finish_mode(result, pending) for result, pending in started]
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    if cache is not None:
+        cache.save()
 
     passed = all(m.get("passed") for m in mode_results)
     summary = {
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Convert lookUpTable files between CSV and the packed binary (memory-mappable) format."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+import mmap
+import shutil
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Iterable
+
+from check_books_package import (
+    LUT_HEADER,
+    LUT_MAGIC,
+    LUT_VERSION,
+    is_lookup_binary,
+    is_weights_header,
+    parse_float,
+    parse_int,
+)
+
+FLUSH_ROWS = 1 << 16
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input", required=True, help="lookUpTable_<mode>_0.csv or packed binary")
+    parser.add_argument("--output", required=True, help="Destination file (the other format)")
+    parser.add_argument(
+        "--header",
+        action="store_true",
+        help="Write an id,weight,payoutMultiplier header row when producing CSV",
+    )
+    return parser.parse_args()
+
+
+def iter_csv_rows(path: Path) -> Iterable[tuple[int, float, float | None]]:
+    with path.open("r", encoding="utf-8", newline="") as src:
+        for row_no, row in enumerate(csv.reader(src), start=1):
+            if not row or (row_no == 1 and is_weights_header(row)):
+                continue
+            if len(row) < 2:
+                raise ValueError(f"row {row_no}: expected at least 2 columns")
+            try:
+                payout = parse_float(row[2], "payoutMultiplier") if len(row) > 2 else None
+                yield parse_int(row[0], "id"), parse_float(row[1], "weight"), payout
+            except ValueError as exc:
+                raise ValueError(f"row {row_no}: {exc}") from exc
+
+
+def csv_to_binary(source: Path, target: Path) -> int:
+    """Stream CSV rows into the columnar layout, spooling weight/payout columns to temp files."""
+    columns = None
+    rows = 0
+    spools = tempfile.TemporaryFile(), tempfile.TemporaryFile()
+    with target.open("wb") as out, spools[0] as weights_spool, spools[1] as payouts_spool:
+        out.write(b"\0" * LUT_HEADER.size)
+        ids, weights, payouts = array("q"), array("d"), array("d")
+
+        def flush() -> None:
+            for column, sink in ((ids, out), (weights, weights_spool), (payouts, payouts_spool)):
+                if sys.byteorder == "big":
+                    column.byteswap()
+                column.tofile(sink)
+                del column[:]
+
+        for book_id, weight, payout in iter_csv_rows(source):
+            row_columns = 2 if payout is None else 3
+            if columns is None:
+                columns = row_columns
+            elif row_columns != columns:
+                raise ValueError(f"row {rows + 1}: column count changed from {columns} to {row_columns}")
+            ids.append(book_id)
+            weights.append(weight)
+            if payout is not None:
+                payouts.append(payout)
+            rows += 1
+            if len(ids) >= FLUSH_ROWS:
+                flush()
+        flush()
+
+        for spool in (weights_spool, payouts_spool)[: (columns or 2) - 1]:
+            spool.seek(0)
+            shutil.copyfileobj(spool, out)
+        out.seek(0)
+        out.write(LUT_HEADER.pack(LUT_MAGIC, LUT_VERSION, columns or 2, rows, 0))
+    return rows
+
+
+def format_number(value: float) -> str:
+    if math.isfinite(value) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def binary_to_csv(source: Path, target: Path, header: bool) -> int:
+    if sys.byteorder == "big":
+        raise RuntimeError("packed lookup tables are little-endian; convert on a little-endian host")
+    with source.open("rb") as src, mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        _, version, columns, rows, _ = LUT_HEADER.unpack_from(mapped, 0)
+        if version != LUT_VERSION or columns not in (2, 3):
+            raise ValueError(f"unsupported version {version} / columns {columns}")
+        if len(mapped) != LUT_HEADER.size + rows * 8 * columns:
+            raise ValueError(f"size {len(mapped)} does not match {rows} rows x {columns} columns")
+        with memoryview(mapped) as view, target.open("w", encoding="utf-8", newline="") as out:
+            offsets = [LUT_HEADER.size + rows * 8 * column for column in range(columns)]
+            cols = [
+                view[offset:offset + rows * 8].cast("q" if i == 0 else "d")
+                for i, offset in enumerate(offsets)
+            ]
+            writer = csv.writer(out, lineterminator="\n")
+            if header:
+                writer.writerow(["id", "weight", "payoutMultiplier"][:columns])
+            for start in range(0, rows, FLUSH_ROWS):
+                stop = min(start + FLUSH_ROWS, rows)
+                writer.writerows(
+                    [str(cols[0][i])] + [format_number(col[i]) for col in cols[1:]]
+                    for i in range(start, stop)
+                )
+            for col in cols:
+                col.release()
+    return rows
+
+
+def main() -> int:
+    args = parse_args()
+    source = Path(args.input)
+    target = Path(args.output)
+    if not source.exists():
+        print(f"input not found: {source}", file=sys.stderr)
+        return 2
+    if source.resolve() == target.resolve():
+        print("--output must differ from --input", file=sys.stderr)
+        return 2
+
+    try:
+        if is_lookup_binary(source):
+            direction = "binary->csv"
+            rows = binary_to_csv(source, target, args.header)
+        else:
+            direction = "csv->binary"
+            rows = csv_to_binary(source, target)
+    except Exception as exc:
+        print(f"conversion failed: {exc}", file=sys.stderr)
+        return 2
+
+    summary = {"input": str(source), "output": str(target), "direction": direction, "rows": rows}
+    print(json.dumps(summary, separators=(",", ":")))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
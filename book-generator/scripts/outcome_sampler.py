@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Draw weighted outcomes from a mode lookup table (Vose alias method) and check empirical RTP."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Any
+
+from check_books_package import PayoutStats, load_numpy, parse_float, read_weight_columns
+
+DEFAULT_BATCH = 1 << 20
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--index", help="Path to index.json (use with --mode)")
+    source.add_argument("--weights", help="lookUpTable_<mode>_0.csv or packed binary table")
+    parser.add_argument("--mode", help="Mode name in index.json (default: first mode)")
+    parser.add_argument("--cost", type=float, help="Mode cost (default: from index.json, else 1)")
+    parser.add_argument("--draws", type=int, default=10_000_000, help="Outcomes to draw")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="Draws per sample() call")
+    parser.add_argument("--seed", type=int, help="Sampler seed (default: random)")
+    parser.add_argument(
+        "--ids-out", help="Also write drawn book ids here, one per line (load-test replay feed)"
+    )
+    parser.add_argument("--ids-count", type=int, default=1_000_000, help="Book ids to write with --ids-out")
+    parser.add_argument(
+        "--payout-scale",
+        type=float,
+        default=1.0,
+        help="Divisor applied to lookup payoutMultiplier values (e.g. 100 for integer-cent tables)",
+    )
+    parser.add_argument(
+        "--sigmas",
+        type=float,
+        default=4.0,
+        help="Fail when empirical RTP is more than this many standard errors from the analytical RTP",
+    )
+    parser.add_argument("--sampler", choices=("auto", "numpy", "python"), default="auto")
+    return parser.parse_args()
+
+
+class AliasSampler:
+    """Vose alias table over lookup rows: O(n) build (O(n log n) vectorised), O(1) per draw.
+
+    Draw k picks column i uniformly, then returns i when u < prob[i] and alias[i]
+    otherwise. With NumPy the build and both draw steps are array operations;
+    without it the same table is built by the pairing loop and walked with
+    random.Random.
+    """
+
+    def __init__(
+        self,
+        ids: Any,
+        weights: Any,
+        payouts: Any = None,
+        seed: int | None = None,
+        np: Any = None,
+    ) -> None:
+        rows = len(weights)
+        if rows == 0:
+            raise ValueError("lookup table has no rows")
+        if len(ids) != rows or (payouts is not None and len(payouts) != rows):
+            raise ValueError("lookup columns differ in length")
+        if np is not None:
+            if not (np.isfinite(weights).all() and (weights > 0).all()):
+                raise ValueError("lookup weights must be finite and > 0")
+            total = float(weights.sum())
+        else:
+            if not all(math.isfinite(weight) and weight > 0 for weight in weights):
+                raise ValueError("lookup weights must be finite and > 0")
+            total = math.fsum(weights)
+
+        self.np = np
+        self.ids = ids
+        self.payouts = payouts
+        self.rows = rows
+        self.total_weight = total
+        if np is not None:
+            self.prob, self.alias = self.build_arrays(np, weights, total)
+            self.rng = np.random.default_rng(seed)
+        else:
+            prob, alias = self.build(weights, total)
+            self.prob = array("d", prob)
+            self.alias = array("q", alias)
+            self.rng = random.Random(seed)
+
+    @staticmethod
+    def build(weights: Any, total: float) -> tuple[list[float], list[int]]:
+        rows = len(weights)
+        scaled = [weight * rows / total for weight in weights]
+        prob = [1.0] * rows
+        alias = list(range(rows))
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = (scaled[more] + scaled[less]) - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Leftovers are 1.0 up to rounding; they keep prob 1 and alias to themselves.
+        return prob, alias
+
+    @staticmethod
+    def build_arrays(np: Any, weights: Any, total: float) -> tuple[Any, Any]:
+        """Vectorised alias table: the pairing loop of build() as one sweep over cumulative sums.
+
+        Laying the small columns' deficits (1 - p) end to end and the large columns'
+        excesses (p - 1) end to end gives two partitions of the same interval. Each
+        small column aliases the large one whose excess covers the start of its
+        deficit; a large column pushed below 1 by the small column straddling its
+        end keeps the overshoot as its own deficit and aliases the next large one.
+        """
+        rows = len(weights)
+        scaled = weights * (rows / total)
+        prob = np.ones(rows, dtype=np.float64)
+        alias = np.arange(rows, dtype=np.int64)
+        small = np.flatnonzero(scaled < 1.0)
+        large = np.flatnonzero(scaled > 1.0)
+        if small.size == 0 or large.size == 0:
+            return prob, alias
+        deficit = np.cumsum(1.0 - scaled[small])
+        starts = np.concatenate(([0.0], deficit[:-1]))
+        excess = np.cumsum(scaled[large] - 1.0)
+        owner = np.minimum(np.searchsorted(excess, starts, side="right"), large.size - 1)
+        prob[small] = scaled[small]
+        alias[small] = large[owner]
+        # Deficit consumed once every small column starting inside large j's excess is placed.
+        consumed = np.concatenate(([0.0], deficit))[np.searchsorted(starts, excess[:-1], side="left")]
+        prob[large[:-1]] = 1.0 - np.clip(consumed - excess[:-1], 0.0, 1.0)
+        alias[large[:-1]] = large[1:]
+        return prob, alias
+
+    def sample_indices(self, n: int) -> Any:
+        """Row positions of n independent draws (ndarray with NumPy, else array('q'))."""
+        if self.np is not None:
+            columns = self.rng.integers(0, self.rows, size=n)
+            keep = self.rng.random(n) < self.prob[columns]
+            return self.np.where(keep, columns, self.alias[columns])
+        rand = self.rng.random
+        rows, prob, alias = self.rows, self.prob, self.alias
+        picks = array("q", bytes(8 * n))
+        for k in range(n):
+            column = int(rand() * rows)
+            picks[k] = column if rand() < prob[column] else alias[column]
+        return picks
+
+    def sample(self, n: int) -> Any:
+        """Book ids of n independent weighted draws."""
+        picks = self.sample_indices(n)
+        if self.np is not None:
+            return self.ids[picks]
+        ids = self.ids
+        return array("q", (ids[pick] for pick in picks))
+
+    def payout_sum(self, picks: Any) -> float:
+        if self.np is not None:
+            return float(self.payouts[picks].sum())
+        payouts = self.payouts
+        return math.fsum(payouts[pick] for pick in picks)
+
+
+def analytical_stats(np: Any, weights: Any, payouts: Any) -> tuple[PayoutStats, float]:
+    """Exact weighted payout stats plus the payout second moment E[X^2]."""
+    stats = PayoutStats()
+    if np is not None:
+        stats.add_arrays(np, weights, payouts)
+        second = float(weights @ (payouts * payouts))
+    else:
+        for weight, payout in zip(weights, payouts):
+            stats.add(weight, payout)
+        second = math.fsum(weight * payout * payout for weight, payout in zip(weights, payouts))
+    return stats, second / stats.total_weight
+
+
+def resolve_mode(index_path: Path, mode_name: str | None) -> tuple[Path, float, str]:
+    data = json.loads(index_path.read_text(encoding="utf-8"))
+    modes = data.get("modes") if isinstance(data, dict) else None
+    if not isinstance(modes, list) or not modes:
+        raise ValueError("index.json must contain a non-empty modes list")
+    for mode in modes:
+        if isinstance(mode, dict) and (mode_name is None or mode.get("name") == mode_name):
+            if "weights" not in mode:
+                raise ValueError(f"mode {mode.get('name')!r} has no weights file")
+            cost = parse_float(mode.get("cost", 1.0), "cost")
+            return (index_path.parent / str(mode["weights"])).resolve(), cost, str(mode.get("name"))
+    raise ValueError(f"mode {mode_name!r} not found in {index_path}")
+
+
+def main() -> int:
+    args = parse_args()
+    if args.draws <= 0 or args.batch <= 0 or args.ids_count <= 0:
+        print("--draws, --batch and --ids-count must be > 0", file=sys.stderr)
+        return 2
+    if args.payout_scale <= 0:
+        print("--payout-scale must be > 0", file=sys.stderr)
+        return 2
+
+    np = load_numpy() if args.sampler != "python" else None
+    if args.sampler == "numpy" and np is None:
+        print("--sampler numpy requires the numpy package", file=sys.stderr)
+        return 2
+
+    try:
+        if args.index:
+            weights_path, cost, mode_name = resolve_mode(Path(args.index), args.mode)
+        else:
+            weights_path, cost, mode_name = Path(args.weights), 1.0, args.mode
+        if args.cost is not None:
+            cost = args.cost
+        if cost <= 0:
+            raise ValueError(f"mode cost must be > 0, got {cost}")
+        if not weights_path.exists():
+            raise ValueError(f"weights file not found: {weights_path}")
+
+        started = time.perf_counter()
+        ids, weights, payouts = read_weight_columns(weights_path, args.payout_scale, np)
+        loaded = time.perf_counter()
+        sampler = AliasSampler(ids, weights, payouts, args.seed, np)
+        built = time.perf_counter()
+    except Exception as exc:
+        print(f"failed to build sampler: {exc}", file=sys.stderr)
+        return 2
+
+    payout_total = 0.0
+    remaining = args.draws
+    sample_started = time.perf_counter()
+    while remaining > 0:
+        count = min(args.batch, remaining)
+        picks = sampler.sample_indices(count)
+        if payouts is not None:
+            payout_total += sampler.payout_sum(picks)
+        remaining -= count
+    sample_seconds = time.perf_counter() - sample_started
+
+    ids_written = 0
+    if args.ids_out:
+        try:
+            with open(args.ids_out, "w", encoding="utf-8") as dst:
+                while ids_written < args.ids_count:
+                    count = min(args.batch, args.ids_count - ids_written)
+                    dst.write("\n".join(map(str, sampler.sample(count).tolist())) + "\n")
+                    ids_written += count
+        except OSError as exc:
+            print(f"failed to write --ids-out: {exc}", file=sys.stderr)
+            return 2
+
+    summary: dict[str, Any] = {
+        "mode": mode_name,
+        "weightsPath": str(weights_path),
+        "sampler": "numpy" if np is not None else "python",
+        "rows": sampler.rows,
+        "loadSeconds": loaded - started,
+        "buildSeconds": built - loaded,
+        "draws": args.draws,
+        "sampleSeconds": sample_seconds,
+        "drawsPerSec": args.draws / sample_seconds if sample_seconds > 0 else 0.0,
+    }
+    if args.ids_out:
+        summary["idsOut"] = args.ids_out
+        summary["idsWritten"] = ids_written
+    if payouts is None:
+        summary["rtp"] = None
+        summary["passed"] = True
+        print(json.dumps(summary, separators=(",", ":")))
+        return 0
+
+    stats, second_moment = analytical_stats(np, weights, payouts)
+    mean_payout = stats.weighted_payout / stats.total_weight
+    stdev = math.sqrt(max(0.0, second_moment - mean_payout * mean_payout))
+    empirical = payout_total / args.draws / cost
+    analytical = mean_payout / cost
+    std_error = stdev / math.sqrt(args.draws) / cost
+    z_score = (empirical - analytical) / std_error if std_error > 0 else 0.0
+    passed = abs(z_score) <= args.sigmas if std_error > 0 else math.isclose(empirical, analytical)
+    summary.update(
+        {
+            "analyticalRtp": analytical,
+            "empiricalRtp": empirical,
+            "stdError": std_error,
+            "zScore": z_score,
+            "sigmas": args.sigmas,
+            "passed": passed,
+        }
+    )
+    print(json.dumps(summary, separators=(",", ":")))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""Append-only SQLite history of benchmark and latency runs with change-point detection across commits."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from compare_benchmark_json import TIME_UNIT_TO_NS, load_benchmarks, mean, metric_direction, parse_metrics
+
+KINDS = ("benchmark", "latency")
+LATENCY_METRIC = "latency_ms"
+PERCENTILE_KEY = re.compile(r"^p\d+$")
+NS_PER_MS = TIME_UNIT_TO_NS["ms"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    host TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    series TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    repetitions INTEGER NOT NULL,
+    stddev REAL,
+    PRIMARY KEY (run_id, series, metric)
+);
+CREATE INDEX IF NOT EXISTS samples_series ON samples(series, metric);
+CREATE TRIGGER IF NOT EXISTS runs_append_only_update BEFORE UPDATE ON runs
+    BEGIN SELECT RAISE(ABORT, 'history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS runs_append_only_delete BEFORE DELETE ON runs
+    BEGIN SELECT RAISE(ABORT, 'history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS samples_append_only_update BEFORE UPDATE ON samples
+    BEGIN SELECT RAISE(ABORT, 'history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS samples_append_only_delete BEFORE DELETE ON samples
+    BEGIN SELECT RAISE(ABORT, 'history is append-only'); END;
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", required=True, help="SQLite history file (created on first ingest)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Append one run per input file")
+    ingest.add_argument(
+        "inputs",
+        nargs="+",
+        help="Google Benchmark JSON or latency percentile snapshot JSON (p50/p99/... keys, optional unit); "
+        "raw samples, histogram dumps and .hgrm files are not accepted",
+    )
+    ingest.add_argument("--commit", required=True, help="Commit the run was measured on")
+    ingest.add_argument("--host", required=True, help="Host or runner label")
+    ingest.add_argument("--kind", choices=("auto",) + KINDS, default="auto")
+    ingest.add_argument(
+        "--metric",
+        default="cpu_time",
+        help="Benchmark metrics to store, same syntax as compare_benchmark_json.py --metric",
+    )
+    ingest.add_argument("--timestamp", help="ISO-8601 time of the run (default: now); runs are ordered by it")
+
+    query = commands.add_parser("query", help="Print stored values as JSON")
+    add_filters(query)
+    query.add_argument("--commit", help="Only this commit")
+    query.add_argument("--runs", action="store_true", help="List runs instead of values")
+    query.add_argument("--limit", type=int, default=0, help="Keep only the newest N rows (0 = all)")
+
+    detect = commands.add_parser("detect", help="Find step changes per (host, series, metric)")
+    add_filters(detect)
+    detect.add_argument("--min-segment", type=int, default=3, help="Minimum runs on each side of a change")
+    detect.add_argument(
+        "--penalty",
+        type=float,
+        default=2.0,
+        help="Split when the squared-error gain exceeds penalty * noise variance * ln(runs)",
+    )
+    detect.add_argument(
+        "--threshold-pct",
+        type=float,
+        default=1.0,
+        help="Change points at least this large in the bad direction are regressions",
+    )
+    detect.add_argument(
+        "--recent",
+        type=int,
+        default=0,
+        help="Only fail on regressions that start within the newest N runs of a series (0 = any)",
+    )
+    return parser.parse_args()
+
+
+def add_filters(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--kind", choices=KINDS)
+    parser.add_argument("--host")
+    parser.add_argument("--series", help="Benchmark name or percentile key; SQLite GLOB patterns allowed")
+    parser.add_argument("--metric", help="cpu_time, items_per_second, latency_ms, ...")
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path))
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def parse_timestamp(text: str | None) -> str:
+    if text is None:
+        moment = datetime.now(timezone.utc)
+    else:
+        moment = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+def stddev(values: list[float]) -> float | None:
+    if len(values) < 2:
+        return None
+    center = mean(values)
+    return math.sqrt(sum((value - center) ** 2 for value in values) / (len(values) - 1))
+
+
+def benchmark_samples(path: Path, metrics: list[str]) -> list[tuple[str, str, float, int, float | None]]:
+    """(series, metric, mean, repetitions, stddev) per benchmark and metric; times are stored in ns."""
+    rows = []
+    for name, by_metric in sorted(load_benchmarks(path, metrics).items()):
+        for metric, values in by_metric.items():
+            rows.append((name, metric, mean(values), len(values), stddev(values)))
+    return rows
+
+
+def latency_samples(path: Path, data: Any) -> list[tuple[str, str, float, int, float | None]]:
+    """Percentile snapshot keys (p50, p99, p999, ...) converted to ms."""
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object of percentile keys")
+    unit = data.get("unit", "ms")
+    if unit not in TIME_UNIT_TO_NS:
+        raise ValueError(f"{path}: unknown unit {unit!r}")
+    rows = []
+    for key, value in data.items():
+        if PERCENTILE_KEY.match(key) and isinstance(value, (int, float)) and math.isfinite(value):
+            rows.append((key, LATENCY_METRIC, float(value) * TIME_UNIT_TO_NS[unit] / NS_PER_MS, 1, None))
+    if not rows:
+        raise ValueError(
+            f"{path}: no p50/p99-style keys; reduce raw samples or histograms to percentiles first"
+        )
+    return rows
+
+
+def ingest(conn: sqlite3.Connection, args: argparse.Namespace) -> dict[str, Any]:
+    metrics = [metric for metric, _ in parse_metrics(args.metric)]
+    recorded_at = parse_timestamp(args.timestamp)
+    prepared = []
+    for name in args.inputs:
+        path = Path(name)
+        data = json.loads(path.read_text(encoding="utf-8"))
+        kind = args.kind
+        if kind == "auto":
+            kind = "benchmark" if isinstance(data, dict) and "benchmarks" in data else "latency"
+        samples = benchmark_samples(path, metrics) if kind == "benchmark" else latency_samples(path, data)
+        if not samples:
+            raise ValueError(f"{path}: no values for metrics {', '.join(metrics)}")
+        prepared.append((kind, path, samples))
+
+    run_ids = []
+    with conn:
+        for kind, path, samples in prepared:
+            cursor = conn.execute(
+                "INSERT INTO runs (kind, commit_sha, host, recorded_at, source) VALUES (?, ?, ?, ?, ?)",
+                (kind, args.commit, args.host, recorded_at, str(path)),
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO samples (run_id, series, metric, value, repetitions, stddev) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, *sample) for sample in samples],
+            )
+            run_ids.append({"run_id": run_id, "kind": kind, "source": str(path), "values": len(samples)})
+    return {"commit": args.commit, "host": args.host, "recorded_at": recorded_at, "runs": run_ids}
+
+
+def filter_clause(args: argparse.Namespace) -> tuple[str, list[Any]]:
+    clauses, params = [], []
+    for column, value, op in (
+        ("r.kind", args.kind, "="),
+        ("r.host", args.host, "="),
+        ("s.series", args.series, "GLOB"),
+        ("s.metric", args.metric, "="),
+        ("r.commit_sha", getattr(args, "commit", None), "="),
+    ):
+        if value is not None:
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def query(conn: sqlite3.Connection, args: argparse.Namespace) -> dict[str, Any]:
+    where, params = filter_clause(args)
+    if args.runs:
+        sql = (
+            "SELECT r.id, r.kind, r.commit_sha, r.host, r.recorded_at, r.source, COUNT(*) "
+            f"FROM runs r JOIN samples s ON s.run_id = r.id{where} GROUP BY r.id "
+            "ORDER BY r.recorded_at DESC, r.id DESC"
+        )
+        fields = ("run_id", "kind", "commit", "host", "recorded_at", "source", "values")
+    else:
+        sql = (
+            "SELECT r.id, r.kind, r.commit_sha, r.host, r.recorded_at, s.series, s.metric, s.value, "
+            f"s.repetitions, s.stddev FROM runs r JOIN samples s ON s.run_id = r.id{where} "
+            "ORDER BY r.recorded_at DESC, r.id DESC, s.series, s.metric"
+        )
+        fields = (
+            "run_id",
+            "kind",
+            "commit",
+            "host",
+            "recorded_at",
+            "series",
+            "metric",
+            "value",
+            "repetitions",
+            "stddev",
+        )
+    if args.limit > 0:
+        sql += f" LIMIT {int(args.limit)}"
+    rows = [dict(zip(fields, row)) for row in conn.execute(sql, params)]
+    rows.reverse()
+    return {"rows": rows, "count": len(rows)}
+
+
+def noise_variance(values: list[float]) -> float:
+    """Robust per-run variance from the median absolute first difference (insensitive to the steps)."""
+    diffs = sorted(abs(b - a) for a, b in zip(values, values[1:]))
+    if not diffs:
+        return 0.0
+    mid = len(diffs) // 2
+    median = diffs[mid] if len(diffs) % 2 else (diffs[mid - 1] + diffs[mid]) / 2.0
+    sigma = median / 0.6745 / math.sqrt(2.0)
+    if sigma == 0.0:
+        center = mean(values)
+        sigma = math.sqrt(sum((value - center) ** 2 for value in values) / len(values))
+    return sigma * sigma
+
+
+def change_points(values: list[float], min_segment: int, penalty: float) -> list[int]:
+    """Binary segmentation on the mean: indices where a new segment starts, ascending.
+
+    A segment is split at the point maximising the drop in squared error, and the
+    split is kept when that gain exceeds penalty * noise variance * ln(n), a
+    BIC-style test that is scale-free because the noise is estimated from the
+    series itself.
+    """
+    n = len(values)
+    sigma2 = noise_variance(values)
+    if n < 2 * min_segment or sigma2 <= 0:
+        return []
+    prefix, prefix_sq = [0.0], [0.0]
+    for value in values:
+        prefix.append(prefix[-1] + value)
+        prefix_sq.append(prefix_sq[-1] + value * value)
+
+    def sse(lo: int, hi: int) -> float:
+        total = prefix[hi] - prefix[lo]
+        return (prefix_sq[hi] - prefix_sq[lo]) - total * total / (hi - lo)
+
+    limit = penalty * sigma2 * math.log(n)
+    found: list[int] = []
+    pending = [(0, n)]
+    while pending:
+        lo, hi = pending.pop()
+        if hi - lo < 2 * min_segment:
+            continue
+        whole = sse(lo, hi)
+        best_gain, best_k = 0.0, -1
+        for k in range(lo + min_segment, hi - min_segment + 1):
+            gain = whole - sse(lo, k) - sse(k, hi)
+            if gain > best_gain:
+                best_gain, best_k = gain, k
+        if best_k >= 0 and best_gain > limit:
+            found.append(best_k)
+            pending.extend(((lo, best_k), (best_k, hi)))
+    return sorted(found)
+
+
+def detect(conn: sqlite3.Connection, args: argparse.Namespace) -> dict[str, Any]:
+    where, params = filter_clause(args)
+    sql = (
+        "SELECT r.kind, r.host, s.series, s.metric, r.id, r.commit_sha, s.value "
+        f"FROM runs r JOIN samples s ON s.run_id = r.id{where} "
+        "ORDER BY r.kind, r.host, s.series, s.metric, r.recorded_at, r.id"
+    )
+    series: dict[tuple[str, str, str, str], list[tuple[int, str, float]]] = {}
+    for kind, host, name, metric, run_id, commit, value in conn.execute(sql, params):
+        series.setdefault((kind, host, name, metric), []).append((run_id, commit, value))
+
+    found: list[dict[str, Any]] = []
+    regressions: list[dict[str, Any]] = []
+    for (kind, host, name, metric), points in series.items():
+        values = [value for _, _, value in points]
+        starts = change_points(values, args.min_segment, args.penalty)
+        direction = "lower" if kind == "latency" else metric_direction(metric)
+        bounds = [0] + starts + [len(values)]
+        for idx, start in enumerate(starts):
+            before = mean(values[bounds[idx]:start])
+            after = mean(values[start:bounds[idx + 2]])
+            delta = (after - before) / before * 100.0 if before else 0.0
+            regression_pct = delta if direction == "lower" else -delta
+            entry = {
+                "kind": kind,
+                "host": host,
+                "series": name,
+                "metric": metric,
+                "direction": direction,
+                "commit": points[start][1],
+                "previous_commit": points[start - 1][1],
+                "run_id": points[start][0],
+                "runs_before": start - bounds[idx],
+                "runs_after": bounds[idx + 2] - start,
+                "before": before,
+                "after": after,
+                "delta_pct": delta,
+                "regression": regression_pct >= args.threshold_pct,
+            }
+            found.append(entry)
+            if entry["regression"] and (args.recent <= 0 or len(values) - start <= args.recent):
+                regressions.append(entry)
+    regressions.sort(key=lambda r: abs(r["delta_pct"]), reverse=True)
+    return {
+        "series_checked": len(series),
+        "min_segment": args.min_segment,
+        "penalty": args.penalty,
+        "threshold_pct": args.threshold_pct,
+        "change_points": found,
+        "regressions": regressions,
+        "passed": len(regressions) == 0,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    db_path = Path(args.db)
+    if args.command != "ingest" and not db_path.exists():
+        print(json.dumps({"passed": False, "errors": [f"history not found: {db_path}"]}))
+        return 2
+    if args.command == "detect" and (args.min_segment < 1 or args.penalty <= 0):
+        print(json.dumps({"passed": False, "errors": ["--min-segment must be >= 1 and --penalty > 0"]}))
+        return 2
+
+    try:
+        conn = connect(db_path)
+        try:
+            if args.command == "ingest":
+                result = ingest(conn, args)
+            elif args.command == "query":
+                result = query(conn, args)
+            else:
+                result = detect(conn, args)
+        finally:
+            conn.close()
+    except Exception as exc:
+        print(json.dumps({"passed": False, "errors": [str(exc)]}))
+        return 2
+
+    print(json.dumps(result, separators=(",", ":")))
+    if args.command == "detect":
+        return 0 if result["passed"] else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
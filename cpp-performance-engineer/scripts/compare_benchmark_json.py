@@ -4,11 +4,22 @@
 from __future__ import annotations
 
 import argparse
+import itertools
 import json
+import math
+import random
 import sys
 from pathlib import Path
 from typing import Any
 
+AGGREGATE_SUFFIXES = ("_mean", "_median", "_stddev", "_cv")
+STAT_TESTS = ("auto", "none", "bootstrap", "mannwhitney")
+TIME_METRICS = ("cpu_time", "real_time")
+TIME_UNIT_TO_NS = {"ns": 1.0, "us": 1e3, "ms": 1e6, "s": 1e9}
+HIGHER_IS_BETTER_SUFFIXES = ("_per_second", "/s", "_per_sec")
+DIRECTIONS = ("lower", "higher")
+EXACT_U_MAX_RUNS = 40
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
@@ -17,8 +28,9 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--metric",
         default="cpu_time",
-        choices=["cpu_time", "real_time"],
-        help="Metric to compare",
+        help="Comma-separated metrics: cpu_time, real_time, items_per_second, bytes_per_second or any "
+        "user counter (e.g. spins/s,cache_misses); append :higher or :lower to override the inferred "
+        "direction",
     )
     parser.add_argument(
         "--regression-threshold",
@@ -32,32 +44,85 @@ def parse_args() -> argparse.Namespace:
         default=5.0,
         help="Improvement percentage threshold (positive)",
     )
+    parser.add_argument(
+        "--stat",
+        choices=STAT_TESTS,
+        default="auto",
+        help="Significance test over --benchmark_repetitions rows: auto uses Mann-Whitney U when "
+        "the repetitions (ties included) can reach --alpha, otherwise thresholds only",
+    )
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level for --stat")
+    parser.add_argument(
+        "--bootstrap-samples", type=int, default=10_000, help="Bootstrap resamples for --stat bootstrap"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Bootstrap RNG seed (results are reproducible)")
     return parser.parse_args()
 
 
-def load_benchmarks(path: Path, metric: str) -> dict[str, float]:
+def metric_direction(name: str) -> str:
+    """Rates (items_per_second, bytes_per_second, spins/s) are higher-is-better; times and counts lower."""
+    return "higher" if name.endswith(HIGHER_IS_BETTER_SUFFIXES) else "lower"
+
+
+def parse_metrics(text: str) -> list[tuple[str, str]]:
+    metrics: list[tuple[str, str]] = []
+    for item in text.split(","):
+        item = item.strip()
+        name, _, direction = item.rpartition(":")
+        if direction not in DIRECTIONS or not name:
+            name, direction = item, metric_direction(item)
+        if not name:
+            raise ValueError("--metric contains an empty name")
+        if name in (metric for metric, _ in metrics):
+            raise ValueError(f"--metric lists {name} twice")
+        metrics.append((name, direction))
+    return metrics
+
+
+def is_aggregate(row: dict[str, Any], name: str) -> bool:
+    if "run_type" in row:
+        return row["run_type"] == "aggregate"
+    return name.endswith(AGGREGATE_SUFFIXES)
+
+
+def load_benchmarks(path: Path, metrics: list[str]) -> dict[str, dict[str, list[float]]]:
+    """Per-benchmark, per-metric repetition values; aggregate rows (_mean/_median/_stddev/_cv) are skipped.
+
+    cpu_time/real_time are converted from each row's time_unit to ns so files
+    written with different --benchmark_time_unit settings compare directly.
+    """
     data = json.loads(path.read_text(encoding="utf-8"))
     rows = data.get("benchmarks")
     if not isinstance(rows, list):
         raise ValueError(f"{path}: missing 'benchmarks' array")
 
-    result: dict[str, float] = {}
+    result: dict[str, dict[str, list[float]]] = {}
     for idx, row in enumerate(rows):
         if not isinstance(row, dict):
             continue
         name = row.get("name")
-        if not isinstance(name, str):
-            continue
-        value = row.get(metric)
-        if value is None:
+        if not isinstance(name, str) or is_aggregate(row, name) or row.get("error_occurred"):
             continue
-        try:
-            parsed = float(value)
-        except Exception as exc:
-            raise ValueError(f"{path}: invalid {metric} at row {idx}: {exc}") from exc
-        if parsed <= 0:
-            continue
-        result[name] = parsed
+        run_name = row.get("run_name")
+        key = run_name if isinstance(run_name, str) else name
+        for metric in metrics:
+            value = row.get(metric)
+            if value is None:
+                continue
+            try:
+                parsed = float(value)
+            except Exception as exc:
+                raise ValueError(f"{path}: invalid {metric} at row {idx}: {exc}") from exc
+            if not math.isfinite(parsed) or parsed < 0:
+                continue
+            if metric in TIME_METRICS:
+                unit = row.get("time_unit", "ns")
+                if unit not in TIME_UNIT_TO_NS:
+                    raise ValueError(f"{path}: unknown time_unit {unit!r} at row {idx}")
+                if parsed == 0:
+                    continue
+                parsed *= TIME_UNIT_TO_NS[unit]
+            result.setdefault(key, {}).setdefault(metric, []).append(parsed)
     return result
 
 
@@ -65,6 +130,164 @@ def percent_delta(baseline: float, current: float) -> float:
     return ((current - baseline) / baseline) * 100.0
 
 
+def mean(values: list[float]) -> float:
+    return sum(values) / len(values)
+
+
+def cv_pct(values: list[float]) -> float | None:
+    """Coefficient of variation of the repetitions in percent (None for a single run)."""
+    if len(values) < 2:
+        return None
+    center = mean(values)
+    variance = sum((value - center) ** 2 for value in values) / (len(values) - 1)
+    return math.sqrt(variance) / center * 100.0
+
+
+def bootstrap_delta(
+    base: list[float], current: list[float], resamples: int, alpha: float, rng: random.Random
+) -> tuple[float, float, float]:
+    """Percentile-bootstrap CI for the % change of the mean repetition; also a two-sided p-value."""
+    deltas = []
+    for _ in range(resamples):
+        base_mean = sum(rng.choices(base, k=len(base))) / len(base)
+        current_mean = sum(rng.choices(current, k=len(current))) / len(current)
+        deltas.append(percent_delta(base_mean, current_mean))
+    deltas.sort()
+    low = deltas[int(math.floor(alpha / 2 * (resamples - 1)))]
+    high = deltas[int(math.ceil((1 - alpha / 2) * (resamples - 1)))]
+    above = sum(1 for delta in deltas if delta > 0)
+    p_value = min(1.0, 2.0 * min(above, resamples - above + 1) / resamples)
+    return low, high, p_value
+
+
+def u_distribution(m: int, n: int) -> list[int]:
+    """Counts of each U value over all C(m+n, m) orderings of m current and n baseline runs (no ties).
+
+    Built from the largest element down: if it is a current run it beats all j
+    baseline runs (U += j), otherwise it adds nothing; table[j] holds the
+    distribution for (i, j).
+    """
+    table = [[1] for _ in range(n + 1)]
+    for i in range(1, m + 1):
+        row = [[1]]
+        for j in range(1, n + 1):
+            merged = [0] * (i * j + 1)
+            for u, count in enumerate(table[j]):
+                merged[u + j] += count
+            for u, count in enumerate(row[j - 1]):
+                merged[u] += count
+            row.append(merged)
+        table = row
+    return table[n]
+
+
+def u_distribution_ties(base: list[float], current: list[float]) -> dict[int, int]:
+    """Counts of each doubled U over all C(m+n, m) labellings of the pooled repetitions.
+
+    U is doubled so mid-rank halves stay integral. Tied repetitions share their group's
+    mid-rank; groups are walked in ascending order and j of a group's t members
+    go to the current side in C(t, j) ways.
+    """
+    m = len(current)
+    groups = []
+    below = 0
+    for _, members in itertools.groupby(sorted(current + base)):
+        size = len(list(members))
+        groups.append((size, 2 * below + size + 1))
+        below += size
+    table: list[dict[int, int]] = [{} for _ in range(m + 1)]
+    table[0][0] = 1
+    for size, doubled_rank in groups:
+        merged: list[dict[int, int]] = [{} for _ in range(m + 1)]
+        for taken, sums in enumerate(table):
+            for rank_sum, count in sums.items():
+                for j in range(min(size, m - taken) + 1):
+                    bucket = merged[taken + j]
+                    key = rank_sum + j * doubled_rank
+                    bucket[key] = bucket.get(key, 0) + count * math.comb(size, j)
+        table = merged
+    offset = m * (m + 1)
+    return {rank_sum - offset: count for rank_sum, count in table[m].items()}
+
+
+def exact_u_counts(base: list[float], current: list[float]) -> dict[int, int]:
+    """Doubled-U permutation counts; the tie-free case uses the faster u_distribution table."""
+    values = current + base
+    if len(set(values)) == len(values):
+        return {2 * u: count for u, count in enumerate(u_distribution(len(current), len(base)))}
+    return u_distribution_ties(base, current)
+
+
+def mann_whitney_greater(base: list[float], current: list[float]) -> tuple[float, float, float, float]:
+    """One-sided U test that current values are larger; returns (U, p_greater, p_less, p_min).
+
+    Exact permutation p-values (mid-ranks for ties) when both sides have at most
+    EXACT_U_MAX_RUNS repetitions, otherwise the tie-corrected normal approximation.
+    p_min is the smallest one-sided p-value any labelling of these values could
+    reach; integer counters that tie heavily can make it large. No p-value is
+    below 1 / C(m+n, m).
+    """
+    m, n = len(current), len(base)
+    u = 0.0
+    for x in current:
+        for y in base:
+            u += 1.0 if x > y else 0.5 if x == y else 0.0
+    floor = 1.0 / math.comb(m + n, m)
+    if max(m, n) <= EXACT_U_MAX_RUNS:
+        counts = exact_u_counts(base, current)
+        total = sum(counts.values())
+        doubled = int(round(2 * u))
+        p_greater = sum(count for key, count in counts.items() if key >= doubled) / total
+        p_less = sum(count for key, count in counts.items() if key <= doubled) / total
+        p_min = min(counts[max(counts)], counts[min(counts)]) / total
+        return u, max(floor, p_greater), max(floor, p_less), max(floor, p_min)
+    values = current + base
+    center = m * n / 2.0
+    tie_term = 0.0
+    for value in set(values):
+        t = values.count(value)
+        tie_term += t ** 3 - t
+    size = m + n
+    variance = m * n / 12.0 * ((size + 1) - tie_term / (size * (size - 1)))
+    if variance <= 0:
+        return u, 1.0, 1.0, 1.0
+    sd = math.sqrt(variance)
+    p_greater = 0.5 * math.erfc(((u - center - 0.5) / sd) / math.sqrt(2.0))
+    p_less = 0.5 * math.erfc((-(u - center + 0.5) / sd) / math.sqrt(2.0))
+    return u, min(1.0, max(floor, p_greater)), min(1.0, max(floor, p_less)), floor
+
+
+def compare_benchmark(
+    base: list[float], current: list[float], args: argparse.Namespace, rng: random.Random
+) -> tuple[dict[str, Any], bool, bool]:
+    """Row for one benchmark metric plus whether the value significantly increased / decreased."""
+    delta = percent_delta(mean(base), mean(current))
+    row: dict[str, Any] = {
+        "baseline": mean(base),
+        "current": mean(current),
+        "delta_pct": delta,
+        "repetitions": {"baseline": len(base), "current": len(current)},
+        "cv_pct": {"baseline": cv_pct(base), "current": cv_pct(current)},
+    }
+    test = args.stat if len(base) >= 2 and len(current) >= 2 else "none"
+    if test in ("auto", "mannwhitney"):
+        u, p_greater, p_less, p_min = mann_whitney_greater(base, current)
+        # auto only trusts the U test when these values (ties included) could reach alpha at all.
+        test = "mannwhitney" if test == "mannwhitney" or p_min < args.alpha else "none"
+    row["test"] = test
+    if test == "none":
+        return row, True, True
+    if test == "mannwhitney":
+        row["p_value"] = p_greater if delta >= 0 else p_less
+        row["p_min"] = p_min
+        row["effect_size"] = 2.0 * u / (len(base) * len(current)) - 1.0
+        return row, p_greater < args.alpha, p_less < args.alpha
+    ci_low, ci_high, p_value = bootstrap_delta(base, current, args.bootstrap_samples, args.alpha, rng)
+    row["ci_pct"] = [ci_low, ci_high]
+    row["p_value"] = p_value
+    return row, ci_low > 0, ci_high < 0
+
+
 def main() -> int:
     args = parse_args()
     baseline_path = Path(args.baseline)
@@ -75,10 +298,16 @@ def main() -> int:
     if not current_path.exists():
         print(json.dumps({"passed": False, "errors": [f"current not found: {current_path}"]}))
         return 2
+    if not 0 < args.alpha < 1 or args.bootstrap_samples < 100:
+        error = "--alpha must be in (0, 1) and --bootstrap-samples >= 100"
+        print(json.dumps({"passed": False, "errors": [error]}))
+        return 2
 
     try:
-        base = load_benchmarks(baseline_path, args.metric)
-        curr = load_benchmarks(current_path, args.metric)
+        metrics = parse_metrics(args.metric)
+        names = [metric for metric, _ in metrics]
+        base = load_benchmarks(baseline_path, names)
+        curr = load_benchmarks(current_path, names)
     except Exception as exc:
         print(json.dumps({"passed": False, "errors": [str(exc)]}))
         return 2
@@ -88,32 +317,62 @@ def main() -> int:
         print(json.dumps({"passed": False, "errors": ["no common benchmark names"]}))
         return 2
 
+    rng = random.Random(args.seed)
     regressions: list[dict[str, Any]] = []
     improvements: list[dict[str, Any]] = []
     compared: list[dict[str, Any]] = []
+    deltas: dict[str, dict[str, float]] = {}
+    per_metric = {metric: {"compared": 0, "regressions": 0, "improvements": 0} for metric in names}
     for name in common:
-        b = base[name]
-        c = curr[name]
-        delta = percent_delta(b, c)
-        row = {"name": name, "baseline": b, "current": c, "delta_pct": delta}
-        compared.append(row)
-        if delta >= args.regression_threshold:
-            regressions.append(row)
-        elif delta <= -abs(args.improvement_threshold):
-            improvements.append(row)
-
-    regressions.sort(key=lambda r: r["delta_pct"], reverse=True)
-    improvements.sort(key=lambda r: r["delta_pct"])
+        for metric, direction in metrics:
+            base_values = base[name].get(metric)
+            curr_values = curr[name].get(metric)
+            if not base_values or not curr_values or mean(base_values) <= 0:
+                continue
+            fields, increased, decreased = compare_benchmark(base_values, curr_values, args, rng)
+            # regression_pct is the change in the bad direction, so rates and times sort together.
+            if direction == "lower":
+                regression_pct, worse, better = fields["delta_pct"], increased, decreased
+            else:
+                regression_pct, worse, better = -fields["delta_pct"], decreased, increased
+            row = {"name": name, "metric": metric, "direction": direction, **fields}
+            row["regression_pct"] = regression_pct
+            compared.append(row)
+            deltas.setdefault(name, {})[metric] = fields["delta_pct"]
+            per_metric[metric]["compared"] += 1
+            if regression_pct >= args.regression_threshold and worse:
+                regressions.append(row)
+                per_metric[metric]["regressions"] += 1
+            elif regression_pct <= -abs(args.improvement_threshold) and better:
+                improvements.append(row)
+                per_metric[metric]["improvements"] += 1
+
+    if not compared:
+        print(json.dumps({"passed": False, "errors": [f"no common values for metrics {', '.join(names)}"]}))
+        return 2
+
+    regressions.sort(key=lambda r: r["regression_pct"], reverse=True)
+    improvements.sort(key=lambda r: r["regression_pct"])
 
     summary = {
         "metric": args.metric,
+        "metrics": [
+            {"name": metric, "direction": direction, **({"unit": "ns"} if metric in TIME_METRICS else {})}
+            for metric, direction in metrics
+        ],
         "regression_threshold_pct": args.regression_threshold,
         "improvement_threshold_pct": args.improvement_threshold,
-        "benchmarks_compared": len(compared),
+        "stat": args.stat,
+        "alpha": args.alpha,
+        "benchmarks_compared": len(deltas),
+        "benchmarks_tested": len({row["name"] for row in compared if row["test"] != "none"}),
+        "missing_metrics": [metric for metric in names if not per_metric[metric]["compared"]],
         "missing_in_current": sorted(set(base) - set(curr)),
         "missing_in_baseline": sorted(set(curr) - set(base)),
         "regressions_count": len(regressions),
         "improvements_count": len(improvements),
+        "per_metric": per_metric,
+        "deltas": deltas,
         "top_regressions": regressions[:10],
         "top_improvements": improvements[:10],
         "passed": len(regressions) == 0,
@@ -1,30 +1,263 @@
 #!/usr/bin/env python3
-"""Compare latency percentile snapshots and detect regressions."""
+"""Compare latency percentile snapshots or merged latency histograms and detect regressions."""
 
 from __future__ import annotations
 
 import argparse
+import itertools
 import json
+import math
+import random
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
 
 
 PERCENTILE_KEYS = ("p50", "p95", "p99", "p999")
+DEFAULT_PERCENTILES = (50.0, 95.0, 99.0, 99.9)
+DEFAULT_RELATIVE_ERROR = 0.005
+UNIT_TO_MS = {"ns": 1e-6, "us": 1e-3, "ms": 1.0, "s": 1e3}
+STAT_TESTS = ("none", "bootstrap", "mannwhitney")
+EXACT_U_MAX_RUNS = 40
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("--baseline", required=True, help="Baseline latency JSON")
-    parser.add_argument("--current", required=True, help="Current latency JSON")
+    parser.add_argument(
+        "--baseline",
+        required=True,
+        nargs="+",
+        help="Baseline latency file(s); histogram/sample files are merged (e.g. one per host)",
+    )
+    parser.add_argument("--current", required=True, nargs="+", help="Current latency file(s), merged likewise")
     parser.add_argument(
         "--threshold-pct",
         type=float,
         default=5.0,
         help="Max allowed regression percentage per percentile",
     )
+    parser.add_argument(
+        "--percentiles",
+        type=parse_percentiles,
+        help="Comma-separated percentiles for histogram/sample inputs (default: 50,95,99,99.9)",
+    )
+    parser.add_argument(
+        "--relative-error",
+        type=float,
+        default=DEFAULT_RELATIVE_ERROR,
+        help="Relative error bound of the merged histogram's percentile estimates",
+    )
+    parser.add_argument(
+        "--unit",
+        choices=sorted(UNIT_TO_MS),
+        default="ms",
+        help="Unit of inputs that do not declare one (plain sample files, .hgrm dumps)",
+    )
+    parser.add_argument(
+        "--stat",
+        choices=STAT_TESTS,
+        default="none",
+        help="Treat each file as a repeated run and require a significant change "
+        "(bootstrap CI over runs, or one-sided Mann-Whitney U); none merges files",
+    )
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level for --stat")
+    parser.add_argument(
+        "--bootstrap-samples", type=int, default=10_000, help="Bootstrap resamples for --stat"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Bootstrap RNG seed (results are reproducible)")
     return parser.parse_args()
 
 
+def parse_percentiles(text: str) -> list[float]:
+    try:
+        values = [float(part) for part in text.split(",") if part.strip()]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid percentile list: {exc}") from exc
+    if not values or any(not 0 < value <= 100 for value in values):
+        raise argparse.ArgumentTypeError("percentiles must be in (0, 100]")
+    return values
+
+
+def percentile_key(percentile: float) -> str:
+    """50 -> p50, 99.9 -> p999, 99.99 -> p9999 (the naming used by latency snapshots)."""
+    return "p" + f"{percentile:g}".replace(".", "")
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with a relative-error guarantee (DDSketch-style).
+
+    A value v > 0 lands in bucket i = ceil(log_gamma(v)) with gamma = (1 + a) / (1 - a);
+    reporting 2 * gamma^i / (gamma + 1) for that bucket is within a relative
+    error a of every value in it. Histograms with the same a merge by adding
+    bucket counts, so per-host dumps combine without losing the bound.
+    """
+
+    __slots__ = ("relative_error", "gamma", "log_gamma", "counts", "zero_count", "count", "min", "max")
+
+    def __init__(self, relative_error: float = DEFAULT_RELATIVE_ERROR) -> None:
+        if not 0 < relative_error < 1:
+            raise ValueError("relative error must be in (0, 1)")
+        self.relative_error = relative_error
+        self.gamma = (1 + relative_error) / (1 - relative_error)
+        self.log_gamma = math.log(self.gamma)
+        self.counts: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float, count: int = 1) -> None:
+        if count <= 0:
+            return
+        if not math.isfinite(value) or value < 0:
+            raise ValueError(f"latency must be finite and >= 0, got {value}")
+        self.count += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value == 0:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.counts[index] = self.counts.get(index, 0) + count
+
+    def add_all(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other.relative_error != self.relative_error:
+            raise ValueError("cannot merge histograms with different relative error")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def bucket_value(self, index: int) -> float:
+        return 2.0 * self.gamma ** index / (self.gamma + 1.0)
+
+    def percentile(self, percentile: float) -> float:
+        """Nearest-rank percentile (0 < percentile <= 100), clamped to the observed min/max."""
+        if self.count == 0:
+            raise ValueError("histogram is empty")
+        rank = max(1, math.ceil(percentile / 100.0 * self.count))
+        seen = self.zero_count
+        if seen >= rank:
+            return 0.0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self.bucket_value(index), self.min), self.max)
+        return self.max
+
+    def to_json(self) -> dict[str, Any]:
+        buckets = [[self.bucket_value(index), self.counts[index]] for index in sorted(self.counts)]
+        if self.zero_count:
+            buckets.insert(0, [0.0, self.zero_count])
+        return {"unit": "ms", "relativeError": self.relative_error, "buckets": buckets}
+
+
+def parse_bucket(entry: Any) -> tuple[float, int]:
+    if isinstance(entry, dict):
+        for key in ("value", "le", "upper", "ms"):
+            if key in entry:
+                return float(entry[key]), int(entry["count"])
+        raise ValueError("bucket objects need value/le/upper and count")
+    value, count = entry
+    return float(value), int(count)
+
+
+def read_hgrm(path: Path, scale: float, histogram: LatencyHistogram) -> None:
+    """HdrHistogram percentile-distribution text: Value, Percentile, TotalCount (cumulative), 1/(1-P)."""
+    previous_total = 0
+    for line in path.read_text(encoding="utf-8").splitlines():
+        fields = line.split()
+        if len(fields) < 3 or line.lstrip().startswith("#"):
+            continue
+        try:
+            value, total = float(fields[0]), int(float(fields[2]))
+        except ValueError:
+            continue
+        histogram.add(value * scale, total - previous_total)
+        previous_total = max(previous_total, total)
+
+
+def load_latency(path: Path, unit: str, relative_error: float) -> dict[str, float] | LatencyHistogram:
+    """Load a snapshot (dict of percentile scalars) or a histogram from samples / bucket dumps.
+
+    Accepted inputs:
+    - JSON percentile snapshot: {"p50": .., "p95": .., ...} (ms)
+    - JSON samples: {"unit": "us", "samples": [..]}
+    - JSON bucket dump: {"unit": "ms", "buckets": [[value, count], ..]}; objects with
+      value/le/upper + count also work, nested under "histogram" too
+    - HdrHistogram .hgrm percentile distribution text
+    - plain text with one latency per line (first comma-separated column)
+    """
+    histogram = LatencyHistogram(relative_error)
+    if path.suffix.lower() == ".hgrm":
+        read_hgrm(path, UNIT_TO_MS[unit], histogram)
+        return histogram
+    if path.suffix.lower() != ".json":
+        scale = UNIT_TO_MS[unit]
+        with path.open("r", encoding="utf-8") as src:
+            for line_no, line in enumerate(src, start=1):
+                text = line.split(",", 1)[0].strip()
+                if not text or text.startswith("#"):
+                    continue
+                try:
+                    histogram.add(float(text) * scale)
+                except ValueError as exc:
+                    if line_no == 1:
+                        continue
+                    raise ValueError(f"{path}:{line_no}: {exc}") from exc
+        return histogram
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: root must be object")
+    source = data.get("histogram") if isinstance(data.get("histogram"), dict) else data
+    if "samples" not in source and "buckets" not in source:
+        return load_metrics(path)
+    scale = UNIT_TO_MS.get(str(source.get("unit", data.get("unit", unit))))
+    if scale is None:
+        raise ValueError(f"{path}: unit must be one of {', '.join(sorted(UNIT_TO_MS))}")
+    for value in source.get("samples", ()):
+        histogram.add(float(value) * scale)
+    for entry in source.get("buckets", ()):
+        value, count = parse_bucket(entry)
+        histogram.add(value * scale, count)
+    if histogram.count == 0:
+        raise ValueError(f"{path}: no samples or bucket counts")
+    return histogram
+
+
+def load_side(paths: list[Path], unit: str, relative_error: float) -> dict[str, float] | LatencyHistogram:
+    """Merge every file for one side into a single histogram; a lone snapshot passes through."""
+    loaded = [load_latency(path, unit, relative_error) for path in paths]
+    if len(loaded) == 1:
+        return loaded[0]
+    if any(not isinstance(item, LatencyHistogram) for item in loaded):
+        raise ValueError("percentile snapshots cannot be merged; pass histogram or sample files")
+    merged = LatencyHistogram(relative_error)
+    for item in loaded:
+        merged.merge(item)
+    return merged
+
+
+def side_metrics(
+    side: dict[str, float] | LatencyHistogram, percentiles: list[float] | None
+) -> dict[str, float]:
+    if not isinstance(side, LatencyHistogram):
+        return side
+    metrics = {}
+    for percentile in percentiles or DEFAULT_PERCENTILES:
+        value = side.percentile(percentile)
+        if value <= 0:
+            raise ValueError(f"{percentile_key(percentile)} must be > 0")
+        metrics[percentile_key(percentile)] = value
+    return metrics
+
+
 def load_metrics(path: Path) -> dict[str, float]:
     data = json.loads(path.read_text(encoding="utf-8"))
     if not isinstance(data, dict):
@@ -47,25 +280,214 @@ def delta_pct(base: float, current: float) -> float:
     return ((current - base) / base) * 100.0
 
 
+def bootstrap_delta(
+    base: list[float], current: list[float], resamples: int, alpha: float, rng: random.Random
+) -> tuple[float, float, float]:
+    """Percentile-bootstrap CI for the % change of the mean per-run value; also a two-sided p-value."""
+    deltas = []
+    for _ in range(resamples):
+        base_mean = sum(rng.choices(base, k=len(base))) / len(base)
+        current_mean = sum(rng.choices(current, k=len(current))) / len(current)
+        deltas.append(delta_pct(base_mean, current_mean))
+    deltas.sort()
+    low = deltas[int(math.floor(alpha / 2 * (resamples - 1)))]
+    high = deltas[int(math.ceil((1 - alpha / 2) * (resamples - 1)))]
+    above = sum(1 for delta in deltas if delta > 0)
+    p_value = min(1.0, 2.0 * min(above, resamples - above + 1) / resamples)
+    return low, high, p_value
+
+
+def u_distribution(m: int, n: int) -> list[int]:
+    """Counts of each U value over all C(m+n, m) orderings of m current and n baseline runs (no ties).
+
+    Built from the largest element down: if it is a current run it beats all j
+    baseline runs (U += j), otherwise it adds nothing; table[j] holds the
+    distribution for (i, j).
+    """
+    table = [[1] for _ in range(n + 1)]
+    for i in range(1, m + 1):
+        row = [[1]]
+        for j in range(1, n + 1):
+            merged = [0] * (i * j + 1)
+            for u, count in enumerate(table[j]):
+                merged[u + j] += count
+            for u, count in enumerate(row[j - 1]):
+                merged[u] += count
+            row.append(merged)
+        table = row
+    return table[n]
+
+
+def u_distribution_ties(base: list[float], current: list[float]) -> dict[int, int]:
+    """Counts of each doubled U over all C(m+n, m) labellings of the pooled runs.
+
+    U is doubled so mid-rank halves stay integral. Tied runs share their group's
+    mid-rank; groups are walked in ascending order and j of a group's t members
+    go to the current side in C(t, j) ways.
+    """
+    m = len(current)
+    groups = []
+    below = 0
+    for _, members in itertools.groupby(sorted(current + base)):
+        size = len(list(members))
+        groups.append((size, 2 * below + size + 1))
+        below += size
+    table: list[dict[int, int]] = [{} for _ in range(m + 1)]
+    table[0][0] = 1
+    for size, doubled_rank in groups:
+        merged: list[dict[int, int]] = [{} for _ in range(m + 1)]
+        for taken, sums in enumerate(table):
+            for rank_sum, count in sums.items():
+                for j in range(min(size, m - taken) + 1):
+                    bucket = merged[taken + j]
+                    key = rank_sum + j * doubled_rank
+                    bucket[key] = bucket.get(key, 0) + count * math.comb(size, j)
+        table = merged
+    offset = m * (m + 1)
+    return {rank_sum - offset: count for rank_sum, count in table[m].items()}
+
+
+def exact_u_counts(base: list[float], current: list[float]) -> dict[int, int]:
+    """Doubled-U permutation counts; the tie-free case uses the faster u_distribution table."""
+    values = current + base
+    if len(set(values)) == len(values):
+        return {2 * u: count for u, count in enumerate(u_distribution(len(current), len(base)))}
+    return u_distribution_ties(base, current)
+
+
+def mann_whitney_greater(base: list[float], current: list[float]) -> tuple[float, float, float]:
+    """One-sided U test that current runs are slower; returns (U, p_greater, p_less).
+
+    Exact permutation p-values (mid-ranks for ties) when both sides have at most
+    EXACT_U_MAX_RUNS runs, otherwise the tie-corrected normal approximation. No
+    p-value is ever below 1 / C(m+n, m), the chance of the single most extreme
+    labelling.
+    """
+    m, n = len(current), len(base)
+    u = 0.0
+    for x in current:
+        for y in base:
+            u += 1.0 if x > y else 0.5 if x == y else 0.0
+    floor = 1.0 / math.comb(m + n, m)
+    if max(m, n) <= EXACT_U_MAX_RUNS:
+        counts = exact_u_counts(base, current)
+        total = sum(counts.values())
+        doubled = int(round(2 * u))
+        p_greater = sum(count for key, count in counts.items() if key >= doubled) / total
+        p_less = sum(count for key, count in counts.items() if key <= doubled) / total
+        return u, max(floor, p_greater), max(floor, p_less)
+    values = current + base
+    mean = m * n / 2.0
+    tie_term = 0.0
+    for value in set(values):
+        t = values.count(value)
+        tie_term += t ** 3 - t
+    size = m + n
+    variance = m * n / 12.0 * ((size + 1) - tie_term / (size * (size - 1)))
+    if variance <= 0:
+        return u, 1.0, 1.0
+    sd = math.sqrt(variance)
+    p_greater = 0.5 * math.erfc(((u - mean - 0.5) / sd) / math.sqrt(2.0))
+    p_less = 0.5 * math.erfc((-(u - mean + 0.5) / sd) / math.sqrt(2.0))
+    return u, min(1.0, max(floor, p_greater)), min(1.0, max(floor, p_less))
+
+
+def compare_runs(
+    baseline_runs: list[dict[str, float]], current_runs: list[dict[str, float]], args: argparse.Namespace
+) -> dict[str, Any]:
+    """Per-percentile significance over repeated runs; only significant moves past the threshold count."""
+    keys = [key for key in baseline_runs[0] if all(key in run for run in baseline_runs + current_runs)]
+    if not keys:
+        raise ValueError("no percentile keys common to every run")
+    rng = random.Random(args.seed)
+    regressions: list[dict[str, Any]] = []
+    improvements: list[dict[str, Any]] = []
+    compared: dict[str, Any] = {}
+    for key in keys:
+        base = [run[key] for run in baseline_runs]
+        current = [run[key] for run in current_runs]
+        base_mean = sum(base) / len(base)
+        current_mean = sum(current) / len(current)
+        delta = delta_pct(base_mean, current_mean)
+        ci_low, ci_high, boot_p = bootstrap_delta(base, current, args.bootstrap_samples, args.alpha, rng)
+        u, p_greater, p_less = mann_whitney_greater(base, current)
+        effect = 2.0 * u / (len(base) * len(current)) - 1.0
+        if args.stat == "mannwhitney":
+            p_value = p_greater if delta >= 0 else p_less
+            slower, faster = p_greater < args.alpha, p_less < args.alpha
+        else:
+            p_value = boot_p
+            slower, faster = ci_low > 0, ci_high < 0
+        compared[key] = {
+            "baseline_ms": base_mean,
+            "current_ms": current_mean,
+            "delta_pct": delta,
+            "ci_pct": [ci_low, ci_high],
+            "p_value": p_value,
+            "effect_size": effect,
+            "runs": {"baseline": len(base), "current": len(current)},
+        }
+        entry = {"metric": key, "delta_pct": delta, "ci_pct": [ci_low, ci_high], "p_value": p_value}
+        if delta >= args.threshold_pct and slower:
+            regressions.append(entry)
+        elif delta <= -abs(args.threshold_pct) and faster:
+            improvements.append(entry)
+    regressions.sort(key=lambda r: r["delta_pct"], reverse=True)
+    improvements.sort(key=lambda r: r["delta_pct"])
+    return {
+        "threshold_pct": args.threshold_pct,
+        "stat": args.stat,
+        "alpha": args.alpha,
+        "effect_size_metric": "rank_biserial",
+        "compared": compared,
+        "regressions": regressions,
+        "improvements": improvements,
+        "passed": len(regressions) == 0,
+    }
+
+
 def main() -> int:
     args = parse_args()
-    baseline_path = Path(args.baseline)
-    current_path = Path(args.current)
-    if not baseline_path.exists():
-        print(json.dumps({"passed": False, "errors": [f"baseline not found: {baseline_path}"]}))
-        return 2
-    if not current_path.exists():
-        print(json.dumps({"passed": False, "errors": [f"current not found: {current_path}"]}))
-        return 2
+    for label, paths in (("baseline", args.baseline), ("current", args.current)):
+        for path in map(Path, paths):
+            if not path.exists():
+                print(json.dumps({"passed": False, "errors": [f"{label} not found: {path}"]}))
+                return 2
+
+    if args.stat != "none":
+        error = None
+        if len(args.baseline) < 2 or len(args.current) < 2:
+            error = "--stat needs at least 2 baseline and 2 current runs"
+        elif not 0 < args.alpha < 1 or args.bootstrap_samples < 100:
+            error = "--alpha must be in (0, 1) and --bootstrap-samples >= 100"
+        if error is not None:
+            print(json.dumps({"passed": False, "errors": [error]}))
+            return 2
+        try:
+            baseline_runs, current_runs = (
+                [
+                    side_metrics(load_latency(Path(path), args.unit, args.relative_error), args.percentiles)
+                    for path in paths
+                ]
+                for paths in (args.baseline, args.current)
+            )
+            summary = compare_runs(baseline_runs, current_runs, args)
+        except Exception as exc:
+            print(json.dumps({"passed": False, "errors": [str(exc)]}))
+            return 2
+        print(json.dumps(summary, separators=(",", ":")))
+        return 0 if summary["passed"] else 1
 
     try:
-        baseline = load_metrics(baseline_path)
-        current = load_metrics(current_path)
+        baseline_side = load_side([Path(path) for path in args.baseline], args.unit, args.relative_error)
+        current_side = load_side([Path(path) for path in args.current], args.unit, args.relative_error)
+        baseline = side_metrics(baseline_side, args.percentiles)
+        current = side_metrics(current_side, args.percentiles)
     except Exception as exc:
         print(json.dumps({"passed": False, "errors": [str(exc)]}))
         return 2
 
-    common = [k for k in PERCENTILE_KEYS if k in baseline and k in current]
+    common = [k for k in baseline if k in current]
     if not common:
         print(json.dumps({"passed": False, "errors": ["no common percentile keys"]}))
         return 2
@@ -97,6 +519,12 @@ def main() -> int:
         "improvements": improvements,
         "passed": len(regressions) == 0,
     }
+    if isinstance(baseline_side, LatencyHistogram) or isinstance(current_side, LatencyHistogram):
+        summary["relative_error"] = args.relative_error
+        summary["samples"] = {
+            "baseline": baseline_side.count if isinstance(baseline_side, LatencyHistogram) else None,
+            "current": current_side.count if isinstance(current_side, LatencyHistogram) else None,
+        }
     print(json.dumps(summary, separators=(",", ":")))
     return 0 if summary["passed"] else 1
 
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""Open-loop spin/bet load generator with a stand-in RGS server; emits compare_latency_runs.py JSON."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+from compare_latency_runs import DEFAULT_PERCENTILES, DEFAULT_RELATIVE_ERROR, LatencyHistogram, percentile_key
+
+PLAY_PATH = "/wallet/play"
+BET_AMOUNT = 1_000_000
+MAX_HEADER_BYTES = 64 * 1024
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run the stand-in RGS HTTP server")
+    add_server_args(serve)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8099)
+
+    run = commands.add_parser("run", help="Fire spins at a fixed arrival rate and record latency")
+    run.add_argument("--url", help=f"Play endpoint (default: spawn a local stand-in server, {PLAY_PATH})")
+    run.add_argument("--rate", type=float, default=500.0, help="Requests per second (open loop)")
+    run.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    run.add_argument("--warmup", type=float, default=2.0, help="Seconds of load before recording starts")
+    run.add_argument("--connections", type=int, default=64, help="Max keep-alive connections")
+    run.add_argument(
+        "--timeout",
+        type=float,
+        default=10.0,
+        help="Seconds from a request's scheduled start until it counts as timed out",
+    )
+    run.add_argument(
+        "--max-failure-rate",
+        type=float,
+        default=0.01,
+        help="Mark the run invalid (exit 1) when more than this fraction of measured requests "
+        "timed out or failed",
+    )
+    run.add_argument("--mode", default="base", help="Bet mode sent in the play request")
+    run.add_argument("--relative-error", type=float, default=DEFAULT_RELATIVE_ERROR)
+    run.add_argument("--output", help="Write the latency JSON here (stdout summary is always printed)")
+    add_server_args(run)
+    return parser.parse_args()
+
+
+def add_server_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--server-delay-ms", type=float, default=1.0, help="Mean service time (exponential)")
+    parser.add_argument("--stall-every", type=int, default=0, help="Stall once every N requests (0 = never)")
+    parser.add_argument("--stall-ms", type=float, default=50.0, help="Stall length, e.g. a GC pause")
+    parser.add_argument("--seed", type=int, default=1, help="Stand-in server RNG seed")
+
+
+class StandInRgs:
+    """Minimal RGS play endpoint: HTTP/1.1 keep-alive, JSON in/out, configurable service time.
+
+    Stalls block every in-flight request on the server (one shared event), the
+    way a stop-the-world pause does, which is what exposes coordinated omission
+    in closed-loop clients.
+    """
+
+    def __init__(self, delay_ms: float, stall_every: int, stall_ms: float, seed: int) -> None:
+        self.delay = delay_ms / 1000.0
+        self.stall_every = stall_every
+        self.stall = stall_ms / 1000.0
+        self.rng = random.Random(seed)
+        self.served = 0
+        self.balance = 1_000_000_000
+        self.paused = asyncio.Event()
+        self.paused.set()
+
+    async def respond(self, body: bytes) -> bytes:
+        request = json.loads(body or b"{}")
+        self.served += 1
+        if self.stall_every and self.served % self.stall_every == 0:
+            self.paused.clear()
+            await asyncio.sleep(self.stall)
+            self.paused.set()
+        await self.paused.wait()
+        if self.delay > 0:
+            await asyncio.sleep(self.rng.expovariate(1.0 / self.delay))
+        amount = int(request.get("amount", BET_AMOUNT))
+        multiplier = self.rng.choice((0, 0, 0, 0, 50, 100, 200, 1000))
+        self.balance += amount * multiplier // 100 - amount
+        payload = {
+            "balance": {"amount": self.balance, "currency": "USD"},
+            "round": {
+                "mode": request.get("mode", "base"),
+                "payoutMultiplier": multiplier / 100,
+                "events": [],
+            },
+        }
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                length = 0
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                body = await reader.readexactly(length) if length else b""
+                status = b"200 OK"
+                if not head.split(b" ", 2)[1].startswith(PLAY_PATH.encode()):
+                    status, data = b"404 Not Found", b'{"error":"not found"}'
+                else:
+                    try:
+                        data = await self.respond(body)
+                    except ValueError:
+                        status, data = b"400 Bad Request", b'{"error":"invalid json"}'
+                writer.write(
+                    b"HTTP/1.1 " + status + b"\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(data)).encode() + b"\r\n\r\n" + data
+                )
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def serve(host: str, port: int, args: argparse.Namespace, ready: Any = None) -> None:
+    rgs = StandInRgs(args.server_delay_ms, args.stall_every, args.stall_ms, args.seed)
+    server = await asyncio.start_server(rgs.handle, host, port, backlog=1024, limit=MAX_HEADER_BYTES)
+    bound = server.sockets[0].getsockname()[1]
+    if ready is not None:
+        ready.send(bound)
+    else:
+        print(json.dumps({"serving": f"http://{host}:{bound}{PLAY_PATH}"}), flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def serve_process(args: argparse.Namespace, ready: Any) -> None:
+    asyncio.run(serve("127.0.0.1", 0, args, ready))
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections; requests wait for one when all are busy.
+
+    `slots` counts connections that exist or are being opened and bounds the pool;
+    `opened` and `dropped` only ever grow, so they stay meaningful after timeouts
+    cancel requests mid-connect or mid-read.
+    """
+
+    def __init__(self, host: str, port: int, size: int) -> None:
+        self.host = host
+        self.port = port
+        self.size = size
+        self.slots = 0
+        self.opened = 0
+        self.dropped = 0
+        self.idle: asyncio.Queue = asyncio.Queue()
+
+    async def acquire(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self.idle.empty() and self.slots < self.size:
+            self.slots += 1
+            connected = False
+            try:
+                conn = await asyncio.open_connection(self.host, self.port, limit=MAX_HEADER_BYTES)
+                connected = True
+            finally:
+                # Also reached on CancelledError from wait_for, which `except Exception` would miss.
+                if not connected:
+                    self.slots -= 1
+            self.opened += 1
+            return conn
+        return await self.idle.get()
+
+    def release(self, conn: tuple[asyncio.StreamReader, asyncio.StreamWriter], healthy: bool) -> None:
+        if healthy:
+            self.idle.put_nowait(conn)
+            return
+        conn[1].close()
+        self.slots -= 1
+        self.dropped += 1
+
+    def close(self) -> None:
+        while not self.idle.empty():
+            self.idle.get_nowait()[1].close()
+
+
+async def post(pool: ConnectionPool, request: bytes) -> tuple[float, int]:
+    """Send one request; returns (time the request was written, HTTP status)."""
+    conn = await pool.acquire()
+    healthy = False
+    try:
+        reader, writer = conn
+        sent = time.perf_counter()
+        writer.write(request)
+        head = await reader.readuntil(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        length = 0
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+        if length:
+            await reader.readexactly(length)
+        healthy = True
+        return sent, status
+    finally:
+        pool.release(conn, healthy)
+
+
+async def run_load(url: str, args: argparse.Namespace) -> dict[str, Any]:
+    """Open-loop schedule: request k is due at start + k / rate whether or not earlier ones finished.
+
+    Corrected latency is measured from that intended start, so time spent waiting
+    behind a stalled server or for a free connection counts against the system
+    (coordinated-omission correction). The timeout runs from the intended start as
+    well, and a timed-out request is recorded at its elapsed time (at least
+    --timeout) rather than dropped. Service latency from the actual write is kept
+    separately for comparison; it only covers completed requests.
+    """
+    parts = urlsplit(url)
+    if parts.scheme != "http" or not parts.hostname:
+        raise ValueError("--url must be http://host:port/path")
+    path = parts.path or PLAY_PATH
+    pool = ConnectionPool(parts.hostname, parts.port or 80, args.connections)
+    corrected = LatencyHistogram(args.relative_error)
+    service = LatencyHistogram(args.relative_error)
+    counters = dict.fromkeys(("sent", "measured", "recorded", "failed", "timeouts", "errors", "http_errors"), 0)
+
+    body = json.dumps({"sessionID": "load-test", "amount": BET_AMOUNT, "mode": args.mode}).encode("utf-8")
+    request = (
+        f"POST {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode("ascii") + body
+
+    start = time.perf_counter()
+    record_from = start + args.warmup
+    total = int(round((args.warmup + args.duration) * args.rate))
+
+    async def one(intended: float) -> None:
+        measured = intended >= record_from
+        counters["measured"] += measured
+        outcome = None
+        try:
+            budget = intended + args.timeout - time.perf_counter()
+            if budget <= 0:
+                raise asyncio.TimeoutError
+            sent, status = await asyncio.wait_for(post(pool, request), budget)
+        except asyncio.TimeoutError:
+            outcome = "timeouts"
+        except Exception:
+            outcome = "errors"
+        else:
+            if status >= 400:
+                outcome = "http_errors"
+        done = time.perf_counter()
+        if outcome is not None:
+            counters[outcome] += 1
+            counters["failed"] += measured
+        if not measured or outcome in ("errors", "http_errors"):
+            return
+        counters["recorded"] += 1
+        corrected.add(max(done - intended, args.timeout if outcome else 0.0) * 1000.0)
+        if outcome is None:
+            service.add((done - sent) * 1000.0)
+
+    tasks = set()
+    for k in range(total):
+        intended = start + k / args.rate
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(one(intended))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        counters["sent"] += 1
+    if tasks:
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    pool.close()
+
+    if corrected.count == 0:
+        raise RuntimeError(f"no requests recorded ({counters})")
+    result: dict[str, Any] = {"unit": "ms"}
+    for percentile in DEFAULT_PERCENTILES:
+        result[percentile_key(percentile)] = corrected.percentile(percentile)
+    result["histogram"] = corrected.to_json()
+    result["uncorrected"] = {
+        percentile_key(percentile): service.percentile(percentile) if service.count else None
+        for percentile in DEFAULT_PERCENTILES
+    }
+    result["uncorrected"]["histogram"] = service.to_json()
+    failure_rate = counters["failed"] / counters["measured"] if counters["measured"] else 0.0
+    result["load"] = {
+        "url": url,
+        "rate": args.rate,
+        "achievedRate": counters["sent"] / elapsed if elapsed > 0 else 0.0,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "connections": args.connections,
+        "connectionsOpened": pool.opened,
+        "connectionsDropped": pool.dropped,
+        **counters,
+        "failureRate": failure_rate,
+        "maxFailureRate": args.max_failure_rate,
+        "valid": failure_rate <= args.max_failure_rate,
+    }
+    return result
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.rate <= 0 or args.duration <= 0 or args.warmup < 0 or args.connections <= 0 or args.timeout <= 0:
+        print("--rate, --duration, --connections, --timeout must be > 0 and --warmup >= 0", file=sys.stderr)
+        return 2
+    if not 0 <= args.max_failure_rate <= 1:
+        print("--max-failure-rate must be in [0, 1]", file=sys.stderr)
+        return 2
+
+    server = None
+    url = args.url
+    if url is None:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        server = multiprocessing.Process(target=serve_process, args=(args, sender), daemon=True)
+        server.start()
+        if not receiver.poll(10):
+            print("stand-in server did not start", file=sys.stderr)
+            server.terminate()
+            return 2
+        url = f"http://127.0.0.1:{receiver.recv()}{PLAY_PATH}"
+
+    try:
+        result = asyncio.run(run_load(url, args))
+    except Exception as exc:
+        print(f"load run failed: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, separators=(",", ":")), encoding="utf-8")
+    summary = {key: value for key, value in result.items() if key not in ("histogram", "uncorrected")}
+    uncorrected = result["uncorrected"]
+    summary["uncorrected"] = {key: value for key, value in uncorrected.items() if key != "histogram"}
+    print(json.dumps(summary, separators=(",", ":")))
+    if not result["load"]["valid"]:
+        print(
+            f"invalid run: {result['load']['failureRate']:.2%} of measured requests timed out or failed "
+            f"(max {args.max_failure_rate:.2%})",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,6 +5,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import math
 from pathlib import Path
 from typing import Any
 
@@ -25,9 +26,34 @@ def parse_args() -> argparse.Namespace:
         default=10.0,
         help="Efficiency drop threshold percent vs baseline at same threads",
     )
+    parser.add_argument(
+        "--serial-fraction-threshold",
+        type=float,
+        default=0.02,
+        help="Flag when the fitted USL serial fraction (sigma) grows by more than this (absolute)",
+    )
+    parser.add_argument(
+        "--coherency-threshold",
+        type=float,
+        default=0.001,
+        help="Flag when the fitted USL coherency coefficient (kappa) grows by more than this (absolute)",
+    )
+    parser.add_argument(
+        "--predict-threads",
+        default="",
+        help="Comma-separated thread counts to predict from the fitted models "
+        "(thread counts measured on only one side are always predicted)",
+    )
     return parser.parse_args()
 
 
+def parse_threads(text: str) -> list[int]:
+    threads = sorted({int(part) for part in text.split(",") if part.strip()})
+    if any(t <= 0 for t in threads):
+        raise ValueError("--predict-threads values must be > 0")
+    return threads
+
+
 def load_runs(path: Path) -> dict[int, float]:
     data = json.loads(path.read_text(encoding="utf-8"))
     rows = data.get("runs")
@@ -58,6 +84,85 @@ def efficiency(single_thread_throughput: float, throughput: float, threads: int)
     return throughput / (single_thread_throughput * threads)
 
 
+def usl_throughput(model: dict[str, float], threads: int) -> float:
+    """USL throughput X(N) = lambda N / (1 + sigma (N - 1) + kappa N (N - 1)); Amdahl is kappa = 0."""
+    n = threads
+    return model["lambda"] * n / (1.0 + model["sigma"] * (n - 1) + model["kappa"] * n * (n - 1))
+
+
+def r_squared(runs: dict[int, float], model: dict[str, float]) -> float | None:
+    values = list(runs.values())
+    center = sum(values) / len(values)
+    total = sum((value - center) ** 2 for value in values)
+    if total == 0:
+        return None
+    residual = sum((thr - usl_throughput(model, t)) ** 2 for t, thr in runs.items())
+    return 1.0 - residual / total
+
+
+def fit_scaling(runs: dict[int, float]) -> dict[str, Any]:
+    """Fit Amdahl and USL by Gunther's linearisation, lambda pinned to the measured 1-thread throughput.
+
+    With relative capacity C(N) = X(N) / X(1), N / C(N) - 1 = sigma (N - 1) + kappa N (N - 1),
+    which is linear in (sigma, kappa) with no intercept. Coefficients are kept non-negative;
+    USL needs two multi-thread points, Amdahl one.
+    """
+    lam = runs[1]
+    points = [(t, t * lam / thr - 1.0, t - 1.0, t * (t - 1.0)) for t, thr in sorted(runs.items()) if t > 1]
+    if not points:
+        return {"amdahl": None, "usl": None}
+
+    def single(column: int) -> float:
+        den = sum(point[column] ** 2 for point in points)
+        return max(0.0, sum(point[column] * point[1] for point in points) / den)
+
+    serial = min(1.0, single(2))
+    amdahl = {"lambda": lam, "sigma": serial, "kappa": 0.0}
+    fits: dict[str, Any] = {
+        "amdahl": {
+            "lambda": lam,
+            "serial_fraction": serial,
+            "max_speedup": 1.0 / serial if serial > 0 else None,
+            "r_squared": r_squared(runs, amdahl),
+        },
+        "usl": None,
+    }
+    if len(points) < 2:
+        return fits
+
+    saa = sum(point[2] ** 2 for point in points)
+    sbb = sum(point[3] ** 2 for point in points)
+    sab = sum(point[2] * point[3] for point in points)
+    say = sum(point[2] * point[1] for point in points)
+    sby = sum(point[3] * point[1] for point in points)
+    det = saa * sbb - sab * sab
+    sigma, kappa = (say * sbb - sby * sab) / det, (sby * saa - say * sab) / det
+    if sigma < 0:
+        sigma, kappa = 0.0, single(3)
+    elif kappa < 0:
+        sigma, kappa = serial, 0.0
+    usl = {"lambda": lam, "sigma": sigma, "kappa": kappa}
+    # Throughput peaks at N* = sqrt((1 - sigma) / kappa); without coherency cost it only flattens out.
+    peak = math.sqrt((1.0 - sigma) / kappa) if kappa > 0 and sigma < 1 else None
+    fits["usl"] = {
+        **usl,
+        "r_squared": r_squared(runs, usl),
+        "peak_threads": peak,
+        "peak_throughput": usl_throughput(usl, peak) if peak is not None else None,
+    }
+    return fits
+
+
+def predict(fits: dict[str, Any], threads: int) -> float | None:
+    if fits["usl"] is not None:
+        return usl_throughput(fits["usl"], threads)
+    if fits["amdahl"] is not None:
+        fit = fits["amdahl"]
+        amdahl = {"lambda": fit["lambda"], "sigma": fit["serial_fraction"], "kappa": 0.0}
+        return usl_throughput(amdahl, threads)
+    return None
+
+
 def main() -> int:
     args = parse_args()
     b_path = Path(args.baseline)
@@ -72,6 +177,7 @@ def main() -> int:
     try:
         base = load_runs(b_path)
         curr = load_runs(c_path)
+        predict_threads = parse_threads(args.predict_threads)
     except Exception as exc:
         print(json.dumps({"passed": False, "errors": [str(exc)]}))
         return 2
@@ -113,15 +219,54 @@ def main() -> int:
             )
 
     regressions.sort(key=lambda r: r["delta_pct"])
+
+    base_fit = fit_scaling(base)
+    curr_fit = fit_scaling(curr)
+    # USL needs >= 3 thread counts per side; with fewer there is no fit and no model gate.
+    model_regressions: list[dict[str, Any]] = []
+    if base_fit["usl"] is not None and curr_fit["usl"] is not None:
+        for kind, key, threshold in (
+            ("serial_fraction", "sigma", args.serial_fraction_threshold),
+            ("coherency", "kappa", args.coherency_threshold),
+        ):
+            before, after = base_fit["usl"][key], curr_fit["usl"][key]
+            if after - before > abs(threshold):
+                model_regressions.append(
+                    {"type": kind, "baseline": before, "current": after, "delta": after - before}
+                )
+    model_regressions.sort(key=lambda r: -r["delta"])
+
+    predictions: list[dict[str, Any]] = []
+    for t in sorted(set(predict_threads) | (set(base) ^ set(curr))):
+        base_pred = base[t] if t in base else predict(base_fit, t)
+        curr_pred = curr[t] if t in curr else predict(curr_fit, t)
+        predictions.append(
+            {
+                "threads": t,
+                "baseline_throughput": base_pred,
+                "baseline_measured": t in base,
+                "current_throughput": curr_pred,
+                "current_measured": t in curr,
+                "throughput_delta_pct": (
+                    pct_delta(base_pred, curr_pred) if base_pred and curr_pred is not None else None
+                ),
+            }
+        )
+
     summary = {
         "threads_compared": common_threads,
         "regression_threshold_pct": args.regression_threshold_pct,
         "efficiency_drop_threshold_pct": args.efficiency_drop_threshold_pct,
         "rows": rows,
+        "models": {"baseline": base_fit, "current": curr_fit},
+        "predictions": predictions,
+        "serial_fraction_threshold": args.serial_fraction_threshold,
+        "coherency_threshold": args.coherency_threshold,
         "regressions": regressions,
+        "model_regressions": model_regressions,
         "missing_in_current": sorted(set(base) - set(curr)),
         "missing_in_baseline": sorted(set(curr) - set(base)),
-        "passed": len(regressions) == 0,
+        "passed": not regressions and not model_regressions,
     }
     print(json.dumps(summary, separators=(",", ":")))
     return 0 if summary["passed"] else 1
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""Measure spin-simulation throughput across worker counts and emit compare_parallel_scaling.py JSON."""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import csv
+import importlib
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+REEL_STRIP = "AAAAKKKKQQQQJJJJTTTT99998877WWS"
+PAYLINES = ((1, 1, 1, 1, 1), (0, 0, 0, 0, 0), (2, 2, 2, 2, 2), (0, 1, 2, 1, 0), (2, 1, 0, 1, 2))
+Kernel = Callable[[int], int]
+STARTUP_SLACK = 60.0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--kernel",
+        default="reels",
+        help="reels (synthetic 5x3 line evaluation), lookup (weighted draws from --weights), "
+        "or module:factory / path/to/file.py:factory returning fn(batch) -> spins done",
+    )
+    parser.add_argument("--weights", help="lookUpTable_<mode>_0.csv for --kernel lookup")
+    parser.add_argument(
+        "--kernel-arg",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Option passed to the kernel factory (repeatable)",
+    )
+    parser.add_argument(
+        "--threads", help="Comma-separated worker counts (default: 1, powers of two, CPU count)"
+    )
+    parser.add_argument("--trials", type=int, default=3, help="Repeated trials per worker count")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds each worker runs before measuring")
+    parser.add_argument("--duration", type=float, default=3.0, help="Measured seconds per trial")
+    parser.add_argument("--batch", type=int, default=1000, help="Spins per kernel call between clock checks")
+    parser.add_argument("--no-pin", action="store_true", help="Do not pin workers to cores")
+    parser.add_argument("--seed", type=int, default=1, help="Base seed; each worker/trial derives its own")
+    parser.add_argument("--output", help="Write the scaling JSON here as well as stdout")
+    return parser.parse_args()
+
+
+def reels_kernel(options: dict[str, str], seed: int) -> Kernel:
+    """Synthetic base-game spin: five random stops, five paylines, left-to-right matches."""
+    rng = random.Random(seed)
+    strip = REEL_STRIP
+    size = len(strip)
+    pays = {"A": 20, "K": 10, "Q": 5, "J": 4, "T": 3, "9": 2, "8": 2, "7": 1}
+    totals = [0]
+
+    def run(batch: int) -> int:
+        randrange = rng.randrange
+        win = 0
+        for _ in range(batch):
+            stops = [randrange(size) for _ in range(5)]
+            for line in PAYLINES:
+                symbols = [strip[(stop + row) % size] for stop, row in zip(stops, line)]
+                first = symbols[0]
+                if first == "S":
+                    continue
+                count = 1
+                for symbol in symbols[1:]:
+                    if symbol != first and symbol != "W":
+                        break
+                    count += 1
+                if count >= 3:
+                    win += pays.get(first, 0) * (count - 2)
+        totals[0] += win
+        return batch
+
+    return run
+
+
+def lookup_kernel(options: dict[str, str], seed: int) -> Kernel:
+    """Weighted book draws from a lookup table (id,weight[,payoutMultiplier]) via cumulative weights."""
+    path = options.get("weights")
+    if not path:
+        raise ValueError("--kernel lookup needs --weights")
+    cumulative: list[float] = []
+    payouts: list[float] = []
+    total = 0.0
+    with open(path, "r", encoding="utf-8", newline="") as src:
+        for row_no, row in enumerate(csv.reader(src), start=1):
+            if not row:
+                continue
+            try:
+                weight = float(row[1])
+                payout = float(row[2]) if len(row) > 2 else 0.0
+            except (IndexError, ValueError):
+                if row_no == 1:
+                    continue
+                raise ValueError(f"{path}: row {row_no}: expected id,weight[,payoutMultiplier]") from None
+            if not math.isfinite(weight) or weight <= 0:
+                raise ValueError(f"{path}: row {row_no}: weight must be finite and > 0")
+            total += weight
+            cumulative.append(total)
+            payouts.append(payout)
+    if not cumulative:
+        raise ValueError(f"{path}: lookup table has no rows")
+    rng = random.Random(seed)
+    paid = [0.0]
+
+    def run(batch: int) -> int:
+        rand = rng.random
+        pick = bisect.bisect_right
+        acc = 0.0
+        for _ in range(batch):
+            acc += payouts[min(pick(cumulative, rand() * total), len(payouts) - 1)]
+        paid[0] += acc
+        return batch
+
+    return run
+
+
+BUILTIN_KERNELS = {"reels": reels_kernel, "lookup": lookup_kernel}
+
+
+def load_factory(spec: str) -> Callable[[dict[str, str], int], Kernel]:
+    """Resolve a kernel name or module:factory / file.py:factory; factory(options, seed) -> fn(batch)."""
+    if spec in BUILTIN_KERNELS:
+        return BUILTIN_KERNELS[spec]
+    target, sep, attr = spec.rpartition(":")
+    if not sep or not target or not attr:
+        raise ValueError(f"unknown kernel {spec!r}; use reels, lookup, or module:factory")
+    if target.endswith(".py"):
+        module_spec = importlib.util.spec_from_file_location(Path(target).stem, target)
+        if module_spec is None or module_spec.loader is None:
+            raise ValueError(f"cannot load kernel file {target}")
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(target)
+    factory = getattr(module, attr, None)
+    if not callable(factory):
+        raise ValueError(f"{spec}: {attr} is not callable")
+    return factory
+
+
+def available_cpus() -> list[int] | None:
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    return sorted(os.sched_getaffinity(0))
+
+
+def worker(
+    index: int,
+    config: dict[str, Any],
+    seed: int,
+    cpu: int | None,
+    barrier: Any,
+    results: Any,
+) -> None:
+    """Pin, build the kernel, warm up, then count spins for a fixed window started in lockstep."""
+    try:
+        if cpu is not None:
+            os.sched_setaffinity(0, {cpu})
+        run = load_factory(config["kernel"])(config["options"], seed)
+        batch = config["batch"]
+        deadline = time.perf_counter() + config["warmup"]
+        while time.perf_counter() < deadline:
+            run(batch)
+        # Bounded so a worker that died before the barrier cannot strand the rest.
+        barrier.wait(timeout=STARTUP_SLACK)
+        spins = 0
+        started = time.perf_counter()
+        deadline = started + config["duration"]
+        while True:
+            spins += run(batch)
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+        results.put((index, spins, now - started, None))
+    except Exception as exc:
+        barrier.abort()
+        results.put((index, 0, 0.0, f"{type(exc).__name__}: {exc}"))
+
+
+def run_trial(threads: int, config: dict[str, Any], seed: int, cpus: list[int] | None) -> float:
+    """Aggregate steady-state spins/sec of `threads` concurrent worker processes."""
+    barrier = multiprocessing.Barrier(threads)
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(
+            target=worker,
+            args=(i, config, seed + i, cpus[i % len(cpus)] if cpus else None, barrier, results),
+        )
+        for i in range(threads)
+    ]
+    outcomes: dict[int, tuple[int, float, str | None]] = {}
+    deadline = time.monotonic() + config["warmup"] + config["duration"] + 2 * STARTUP_SLACK
+    try:
+        for proc in procs:
+            proc.start()
+        while len(outcomes) < threads:
+            try:
+                index, spins, elapsed, error = results.get(timeout=0.5)
+                outcomes[index] = (spins, elapsed, error)
+                continue
+            except queue.Empty:
+                pass
+            # A worker killed by a signal or the OOM killer never reports; do not wait for it.
+            for index, proc in enumerate(procs):
+                if index not in outcomes and proc.exitcode is not None:
+                    raise RuntimeError(f"worker {index} exited with code {proc.exitcode} without reporting")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"timed out waiting for {threads - len(outcomes)} worker(s)")
+    finally:
+        if len(outcomes) < threads:
+            barrier.abort()
+            for proc in procs:
+                if proc.is_alive():
+                    proc.terminate()
+        for proc in procs:
+            if proc.pid is not None:
+                proc.join()
+    errors = [error for _, _, error in outcomes.values() if error]
+    if errors:
+        raise RuntimeError(errors[0])
+    return sum(spins / elapsed for spins, elapsed, _ in outcomes.values() if elapsed > 0)
+
+
+def default_threads(limit: int) -> list[int]:
+    counts = {1, limit}
+    n = 2
+    while n < limit:
+        counts.add(n)
+        n *= 2
+    return sorted(counts)
+
+
+def main() -> int:
+    args = parse_args()
+    if args.trials <= 0 or args.duration <= 0 or args.warmup < 0 or args.batch <= 0:
+        print("--trials, --duration, --batch must be > 0 and --warmup >= 0", file=sys.stderr)
+        return 2
+
+    options: dict[str, str] = {}
+    for item in args.kernel_arg:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            print(f"--kernel-arg must be KEY=VALUE, got {item!r}", file=sys.stderr)
+            return 2
+        options[key] = value
+    if args.weights:
+        options["weights"] = args.weights
+
+    try:
+        load_factory(args.kernel)(options, args.seed)(1)
+        threads = (
+            sorted({int(part) for part in args.threads.split(",") if part.strip()})
+            if args.threads
+            else default_threads(os.cpu_count() or 1)
+        )
+        if not threads or threads[0] <= 0:
+            raise ValueError("--threads values must be > 0")
+    except Exception as exc:
+        print(f"invalid harness setup: {exc}", file=sys.stderr)
+        return 2
+    if threads[0] != 1:
+        threads.insert(0, 1)
+
+    cpus = None if args.no_pin else available_cpus()
+    config = {
+        "kernel": args.kernel,
+        "options": options,
+        "batch": args.batch,
+        "warmup": args.warmup,
+        "duration": args.duration,
+    }
+    runs: list[dict[str, Any]] = []
+    try:
+        for count in threads:
+            trials = [
+                run_trial(count, config, args.seed + 1000 * trial + 100_000 * count, cpus)
+                for trial in range(args.trials)
+            ]
+            mean = sum(trials) / len(trials)
+            stdev = (
+                math.sqrt(sum((value - mean) ** 2 for value in trials) / (len(trials) - 1))
+                if len(trials) > 1
+                else 0.0
+            )
+            runs.append(
+                {
+                    "threads": count,
+                    "throughput": mean,
+                    "throughput_stddev": stdev,
+                    "cv_pct": stdev / mean * 100.0 if mean > 0 else None,
+                    "trial_throughputs": trials,
+                }
+            )
+    except Exception as exc:
+        print(f"harness run failed: {exc}", file=sys.stderr)
+        return 2
+
+    document = {
+        "runs": runs,
+        "kernel": args.kernel,
+        "unit": "spins/s",
+        "warmup_s": args.warmup,
+        "duration_s": args.duration,
+        "batch": args.batch,
+        "trials": args.trials,
+        "pinned": cpus is not None,
+        "cpus": len(cpus) if cpus else os.cpu_count(),
+    }
+    if cpus is not None and threads[-1] > len(cpus):
+        document["oversubscribed"] = True
+    text = json.dumps(document, separators=(",", ":"))
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
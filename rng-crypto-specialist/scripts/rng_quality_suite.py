@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Statistical quality tests over the HMAC-SHA256 outcome stream used by verify_provably_fair.py."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import secrets
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from verify_provably_fair import BLOCK_WORDS, map_ordered, parse_range_maxes, seed_key
+
+MAX_GAP = 64
+MIN_EXPECTED = 5.0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--server-seed", help="Server seed (default: random, reported by hash only)")
+    parser.add_argument("--client-seed", default="rng-quality-suite")
+    parser.add_argument(
+        "--range-maxes",
+        type=parse_range_maxes,
+        default=[2, 6, 37, 10_000],
+        help="Comma-separated rangeMax values; each gets its own sample stream",
+    )
+    parser.add_argument("--samples", type=int, default=100_000_000, help="Outcomes per rangeMax")
+    parser.add_argument(
+        "--draws-per-nonce",
+        type=int,
+        default=4,
+        help="Outcomes derived per nonce (derive_outcomes cursor semantics)",
+    )
+    parser.add_argument("--bins", type=int, default=1024, help="Max chi-square bins (large ranges are binned)")
+    parser.add_argument(
+        "--gap-interval",
+        default="0,0.5",
+        help="Gap test interval [lower,upper) as fractions of rangeMax",
+    )
+    parser.add_argument("--alpha", type=float, default=0.001, help="Fail a test when its p-value is below this")
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (0 = CPU count)")
+    parser.add_argument("--shard-samples", type=int, default=1_000_000, help="Outcomes per work unit")
+    return parser.parse_args()
+
+
+class ShardStats:
+    """Streaming accumulators for one contiguous slice of the outcome stream.
+
+    Everything is kept as counts and exact integer sums so consecutive shards
+    merge losslessly, including the lag-1 product, run and gap that straddle
+    the shard boundary.
+    """
+
+    __slots__ = (
+        "samples",
+        "words",
+        "rejected",
+        "counts",
+        "total",
+        "total_sq",
+        "lag_product",
+        "first",
+        "last",
+        "above",
+        "runs",
+        "first_sign",
+        "last_sign",
+        "gap_counts",
+        "gap_leading",
+        "gap_trailing",
+        "gap_hit",
+    )
+
+    def __init__(self, bins: int) -> None:
+        self.samples = 0
+        self.words = 0
+        self.rejected = 0
+        self.counts = [0] * bins
+        self.total = 0
+        self.total_sq = 0
+        self.lag_product = 0
+        self.first: int | None = None
+        self.last: int | None = None
+        self.above = 0
+        self.runs = 0
+        self.first_sign: bool | None = None
+        self.last_sign: bool | None = None
+        self.gap_counts = [0] * (MAX_GAP + 1)
+        self.gap_leading = 0
+        self.gap_trailing = 0
+        self.gap_hit = False
+
+    def merge(self, other: "ShardStats") -> None:
+        """Append a shard that directly follows this one in the stream."""
+        if other.samples == 0:
+            return
+        if self.samples == 0:
+            for name in self.__slots__:
+                setattr(self, name, getattr(other, name))
+            return
+        self.samples += other.samples
+        self.words += other.words
+        self.rejected += other.rejected
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.lag_product += other.lag_product + self.last * other.first
+        self.last = other.last
+        self.above += other.above
+        self.runs += other.runs - (self.last_sign == other.first_sign)
+        self.last_sign = other.last_sign
+        if self.gap_hit and other.gap_hit:
+            self.gap_counts = [a + b for a, b in zip(self.gap_counts, other.gap_counts)]
+            self.gap_counts[min(self.gap_trailing + other.gap_leading, MAX_GAP)] += 1
+            self.gap_trailing = other.gap_trailing
+        elif other.gap_hit:
+            self.gap_counts = list(other.gap_counts)
+            self.gap_leading = self.gap_trailing + other.gap_leading
+            self.gap_trailing = other.gap_trailing
+            self.gap_hit = True
+        else:
+            self.gap_trailing += other.gap_trailing
+
+
+def generate_shard(
+    task: tuple[int, int, int],
+    server_seed: str,
+    client_seed: str,
+    draws_per_nonce: int,
+    bins: int,
+    gap_bounds: tuple[int, int],
+) -> ShardStats:
+    """Derive outcomes for nonces [start, stop) and fold them into a ShardStats.
+
+    Each nonce yields draws_per_nonce outcomes exactly as
+    derive_outcomes(serverSeed, clientSeed, nonce, [rangeMax] * draws_per_nonce).
+    """
+    range_max, start, stop = task
+    key = seed_key(server_seed)
+    limit = (1 << 64) // range_max * range_max
+    stats = ShardStats(bins)
+    counts = stats.counts
+    gap_counts = stats.gap_counts
+    gap_low, gap_high = gap_bounds
+    words = rejected = total = total_sq = lag_product = above = runs = 0
+    prev: int | None = None
+    first_sign = last_sign = None
+    gap = gap_leading = 0
+    gap_hit = False
+
+    for nonce in range(start, stop):
+        prefix = f"{client_seed}:{nonce}:"
+        need = draws_per_nonce
+        counter = 0
+        while need:
+            block = BLOCK_WORDS.unpack(key.block(f"{prefix}{counter}".encode("utf-8")))
+            counter += 1
+            for value in block:
+                words += 1
+                if value >= limit:
+                    rejected += 1
+                    continue
+                x = value % range_max
+                counts[x * bins // range_max] += 1
+                total += x
+                total_sq += x * x
+                if prev is None:
+                    stats.first = x
+                else:
+                    lag_product += prev * x
+                prev = x
+                sign = 2 * x >= range_max
+                above += sign
+                if sign != last_sign:
+                    runs += 1
+                    if last_sign is None:
+                        first_sign = sign
+                    last_sign = sign
+                if gap_low <= x < gap_high:
+                    if gap_hit:
+                        gap_counts[min(gap, MAX_GAP)] += 1
+                    else:
+                        gap_leading = gap
+                        gap_hit = True
+                    gap = 0
+                else:
+                    gap += 1
+                need -= 1
+                if not need:
+                    break
+
+    stats.samples = (stop - start) * draws_per_nonce
+    stats.words = words
+    stats.rejected = rejected
+    stats.total = total
+    stats.total_sq = total_sq
+    stats.lag_product = lag_product
+    stats.last = prev
+    stats.above = above
+    stats.runs = runs
+    stats.first_sign = first_sign
+    stats.last_sign = last_sign
+    stats.gap_leading = gap_leading
+    stats.gap_trailing = gap
+    stats.gap_hit = gap_hit
+    return stats
+
+
+def gamma_q(a: float, x: float) -> float:
+    """Regularised upper incomplete gamma Q(a, x) (series / Lentz continued fraction)."""
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1.0:
+        term = total = 1.0 / a
+        denom = a
+        for _ in range(100_000):
+            denom += 1.0
+            term *= x / denom
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    tiny = 1e-300
+    b = x + 1.0 - a
+    c = 1.0 / tiny
+    d = 1.0 / b
+    h = d
+    for i in range(1, 100_000):
+        an = -i * (i - a)
+        b += 2.0
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-15:
+            break
+    return min(1.0, math.exp(log_prefix) * h)
+
+
+def chi_square(observed: list[int], expected: list[float]) -> dict[str, Any]:
+    statistic = math.fsum((o - e) ** 2 / e for o, e in zip(observed, expected) if e > 0)
+    dof = sum(1 for e in expected if e > 0) - 1
+    p_value = gamma_q(dof / 2.0, statistic / 2.0) if dof > 0 else None
+    return {"statistic": statistic, "dof": dof, "pValue": p_value}
+
+
+def normal_p(z: float) -> float:
+    return math.erfc(abs(z) / math.sqrt(2.0))
+
+
+def bin_expected(range_max: int, bins: int, samples: int) -> list[float]:
+    # Bin b holds x with x * bins // range_max == b, i.e. ceil(b*r/bins) <= x < ceil((b+1)*r/bins).
+    edges = [-(-b * range_max // bins) for b in range(bins + 1)]
+    return [samples * (edges[b + 1] - edges[b]) / range_max for b in range(bins)]
+
+
+def summarize_range(range_max: int, stats: ShardStats, gap_bounds: tuple[int, int]) -> dict[str, Any]:
+    n = stats.samples
+    bins = len(stats.counts)
+    uniformity = chi_square(stats.counts, bin_expected(range_max, bins, n))
+    uniformity["bins"] = bins
+
+    # Lag-1 serial correlation from exact integer sums; sqrt(n) * r1 ~ N(0, 1) under independence.
+    numerator = n * n * stats.lag_product - (n - 1) * stats.total * stats.total
+    denominator = (n - 1) * (n * stats.total_sq - stats.total * stats.total)
+    serial = {"lag": 1, "r": None, "z": None, "pValue": None}
+    if n > 2 and denominator > 0:
+        r1 = numerator / denominator
+        z = r1 * math.sqrt(n)
+        serial.update({"r": r1, "z": z, "pValue": normal_p(z)})
+
+    # Wald-Wolfowitz runs above/below rangeMax / 2.
+    n1, n2 = stats.above, n - stats.above
+    runs = {"runs": stats.runs, "expected": None, "z": None, "pValue": None}
+    if n1 and n2:
+        mean = 2.0 * n1 * n2 / n + 1.0
+        variance = 2.0 * n1 * n2 * (2.0 * n1 * n2 - n) / (float(n) * n * (n - 1))
+        z = (stats.runs - mean) / math.sqrt(variance)
+        runs.update({"expected": mean, "z": z, "pValue": normal_p(z)})
+
+    # Gap test: lengths between hits in [low, high) against the geometric law, tail classes pooled.
+    low, high = gap_bounds
+    p = (high - low) / range_max
+    gaps = sum(stats.gap_counts)
+    gap = {"lower": low, "upper": high, "hitProbability": p, "gaps": gaps, "pValue": None}
+    if gaps and 0 < p < 1:
+        classes = 0
+        while (
+            classes < MAX_GAP
+            and gaps * p * (1 - p) ** classes >= MIN_EXPECTED
+            and gaps * (1 - p) ** (classes + 1) >= MIN_EXPECTED
+        ):
+            classes += 1
+        observed = stats.gap_counts[:classes] + [sum(stats.gap_counts[classes:])]
+        expected = [gaps * p * (1 - p) ** k for k in range(classes)] + [gaps * (1 - p) ** classes]
+        gap.update(chi_square(observed, expected))
+
+    expected_retry = ((1 << 64) % range_max) / float(1 << 64)
+    tests = {"chiSquare": uniformity, "serialCorrelation": serial, "runs": runs, "gap": gap}
+    return {
+        "rangeMax": range_max,
+        "samples": n,
+        "wordsRead": stats.words,
+        "rejected": stats.rejected,
+        "retryRate": stats.rejected / stats.words if stats.words else 0.0,
+        "expectedRetryRate": expected_retry,
+        "mean": stats.total / n if n else None,
+        "tests": tests,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    if args.samples <= 0 or args.draws_per_nonce <= 0 or args.shard_samples <= 0 or args.bins <= 1:
+        print("--samples, --draws-per-nonce, --shard-samples must be > 0 and --bins > 1", file=sys.stderr)
+        return 2
+    if any(range_max < 2 for range_max in args.range_maxes):
+        print("--range-maxes values must be >= 2", file=sys.stderr)
+        return 2
+    try:
+        gap_low, gap_high = (float(part) for part in args.gap_interval.split(","))
+    except ValueError:
+        print("--gap-interval must be two comma-separated fractions", file=sys.stderr)
+        return 2
+    if not 0 <= gap_low < gap_high <= 1:
+        print("--gap-interval must satisfy 0 <= lower < upper <= 1", file=sys.stderr)
+        return 2
+
+    server_seed = args.server_seed or secrets.token_hex(32)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    nonces = -(-args.samples // args.draws_per_nonce)
+    shard_nonces = max(1, args.shard_samples // args.draws_per_nonce)
+
+    started = time.perf_counter()
+    results = []
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        for range_max in args.range_maxes:
+            bins = min(args.bins, range_max)
+            gap_bounds = (math.ceil(gap_low * range_max), math.ceil(gap_high * range_max))
+            tasks = (
+                (range_max, start, min(start + shard_nonces, nonces))
+                for start in range(0, nonces, shard_nonces)
+            )
+            merged = ShardStats(bins)
+            for shard in map_ordered(
+                executor,
+                generate_shard,
+                tasks,
+                server_seed,
+                args.client_seed,
+                args.draws_per_nonce,
+                bins,
+                gap_bounds,
+            ):
+                merged.merge(shard)
+            results.append(summarize_range(range_max, merged, gap_bounds))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    elapsed = time.perf_counter() - started
+
+    p_values = [
+        test["pValue"]
+        for result in results
+        for test in result["tests"].values()
+        if test.get("pValue") is not None
+    ]
+    failed = sum(1 for p_value in p_values if p_value < args.alpha)
+    total_samples = sum(result["samples"] for result in results)
+    summary = {
+        "serverSeedHash": seed_key(server_seed).seed_hash,
+        "clientSeed": args.client_seed,
+        "drawsPerNonce": args.draws_per_nonce,
+        "jobs": jobs,
+        "seconds": elapsed,
+        "samplesPerSec": total_samples / elapsed if elapsed > 0 else 0.0,
+        "alpha": args.alpha,
+        "tests": len(p_values),
+        "failedTests": failed,
+        "ranges": results,
+        "passed": failed == 0,
+    }
+    print(json.dumps(summary, separators=(",", ":")))
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
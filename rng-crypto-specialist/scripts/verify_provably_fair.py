@@ -5,31 +5,127 @@ from __future__ import annotations
 
 import argparse
 import hashlib
-import hmac
 import json
+import os
+import struct
 import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator
+
+SHA256_BLOCK_BYTES = 64
+IPAD = bytes(byte ^ 0x36 for byte in range(256))
+OPAD = bytes(byte ^ 0x5C for byte in range(256))
+SEED_CACHE_SIZE = 4096
+MAX_COUNTER = 1_000_000
+CHUNK_LINES = 20_000
+WORD_BYTES = 8
+WORDS_PER_BLOCK = 32 // WORD_BYTES
+BLOCK_WORDS = struct.Struct(">4Q")
+REPORT_MODES = ("text", "jsonl", "failures-only", "summary")
+
+
+class SeedKey:
+    """HMAC-SHA256 keyed by one server seed, with the inner/outer pad states hashed once.
+
+    block() copies the two precomputed SHA-256 states instead of re-deriving the
+    key schedule, which is what hmac.new does on every call (RFC 2104:
+    H(K ^ opad || H(K ^ ipad || m))). The commitment hash is cached alongside.
+    """
+
+    __slots__ = ("inner", "outer", "seed_hash")
+
+    def __init__(self, server_seed: str) -> None:
+        key = server_seed.encode("utf-8")
+        self.seed_hash = hashlib.sha256(key).hexdigest()
+        if len(key) > SHA256_BLOCK_BYTES:
+            key = hashlib.sha256(key).digest()
+        key = key.ljust(SHA256_BLOCK_BYTES, b"\0")
+        self.inner = hashlib.sha256(key.translate(IPAD))
+        self.outer = hashlib.sha256(key.translate(OPAD))
+
+    def block(self, message: bytes) -> bytes:
+        inner = self.inner.copy()
+        inner.update(message)
+        outer = self.outer.copy()
+        outer.update(inner.digest())
+        return outer.digest()
+
+
+@lru_cache(maxsize=SEED_CACHE_SIZE)
+def seed_key(server_seed: str) -> SeedKey:
+    return SeedKey(server_seed)
 
 
 def hmac_block(server_seed: str, client_seed: str, nonce: int, counter: int) -> bytes:
     message = f"{client_seed}:{nonce}:{counter}".encode("utf-8")
-    return hmac.new(server_seed.encode("utf-8"), message, hashlib.sha256).digest()
+    return seed_key(server_seed).block(message)
 
 
-def derive_unbiased_outcome(server_seed: str, client_seed: str, nonce: int, range_max: int) -> tuple[int, int]:
+def derive_with_key(key: SeedKey, client_seed: str, nonce: int, range_max: int) -> tuple[int, int]:
     if range_max <= 0:
         raise ValueError("range_max must be > 0")
 
     limit = (1 << 64) // range_max * range_max
-    for counter in range(1_000_000):
-        block = hmac_block(server_seed, client_seed, nonce, counter)
+    prefix = f"{client_seed}:{nonce}:"
+    for counter in range(MAX_COUNTER):
+        block = key.block(f"{prefix}{counter}".encode("utf-8"))
         value = int.from_bytes(block[:8], byteorder="big", signed=False)
         if value < limit:
             return value % range_max, counter
     raise RuntimeError("failed to derive unbiased value within retry limit")
 
 
+def derive_unbiased_outcome(server_seed: str, client_seed: str, nonce: int, range_max: int) -> tuple[int, int]:
+    return derive_with_key(seed_key(server_seed), client_seed, nonce, range_max)
+
+
+def derive_outcomes_with_key(
+    key: SeedKey, client_seed: str, nonce: int, range_maxes: Iterable[int]
+) -> tuple[list[int], tuple[int, int]]:
+    """Derive one unbiased outcome per rangeMax from a single nonce.
+
+    The nonce's randomness is the stream HMAC(serverSeed, "clientSeed:nonce:counter")
+    for counter = 0, 1, 2, ... Each 32-byte block is read as four big-endian u64
+    words. A cursor (counter, byte offset) walks that stream one word at a time.
+    Each outcome takes the next word; a word >= floor(2^64 / N) * N is rejected
+    and the cursor moves on. Returns the outcomes and the cursor after the last
+    word read; a further draw for the same nonce would start there.
+    """
+    outcomes: list[int] = []
+    prefix = f"{client_seed}:{nonce}:"
+    counter = 0
+    words: tuple[int, ...] = ()
+    word = WORDS_PER_BLOCK
+    for range_max in range_maxes:
+        if range_max <= 0:
+            raise ValueError("range_max must be > 0")
+        limit = (1 << 64) // range_max * range_max
+        while True:
+            if word == WORDS_PER_BLOCK:
+                if counter >= MAX_COUNTER:
+                    raise RuntimeError("failed to derive unbiased value within retry limit")
+                words = BLOCK_WORDS.unpack(key.block(f"{prefix}{counter}".encode("utf-8")))
+                counter += 1
+                word = 0
+            value = words[word]
+            word += 1
+            if value < limit:
+                outcomes.append(value % range_max)
+                break
+    if word == WORDS_PER_BLOCK or not words:
+        return outcomes, (counter, 0)
+    return outcomes, (counter - 1, word * WORD_BYTES)
+
+
+def derive_outcomes(
+    server_seed: str, client_seed: str, nonce: int, range_maxes: Iterable[int]
+) -> tuple[list[int], tuple[int, int]]:
+    return derive_outcomes_with_key(seed_key(server_seed), client_seed, nonce, range_maxes)
+
+
 def verify_row(row: dict[str, Any], default_range_max: int) -> tuple[bool, str]:
     for key in ("serverSeed", "clientSeed", "nonce"):
         if key not in row:
@@ -39,14 +135,32 @@ def verify_row(row: dict[str, Any], default_range_max: int) -> tuple[bool, str]:
     client_seed = str(row["clientSeed"])
     nonce = int(row["nonce"])
     range_max = int(row.get("rangeMax", default_range_max))
-    outcome, counter = derive_unbiased_outcome(server_seed, client_seed, nonce, range_max)
+    key = seed_key(server_seed)
 
     if "serverSeedHash" in row:
-        actual_hash = hashlib.sha256(server_seed.encode("utf-8")).hexdigest()
+        actual_hash = key.seed_hash
         expected_hash = str(row["serverSeedHash"]).lower()
         if actual_hash != expected_hash:
             return False, f"serverSeedHash mismatch: expected={expected_hash} actual={actual_hash}"
 
+    if "rangeMaxes" in row or "expectedOutcomes" in row:
+        expected = row.get("expectedOutcomes")
+        if "rangeMaxes" in row:
+            range_maxes = [int(value) for value in row["rangeMaxes"]]
+        elif isinstance(expected, list):
+            range_maxes = [range_max] * len(expected)
+        else:
+            return False, "expectedOutcomes must be a list"
+        outcomes, (counter, offset) = derive_outcomes_with_key(key, client_seed, nonce, range_maxes)
+        if expected is not None:
+            if not isinstance(expected, list) or len(expected) != len(outcomes):
+                return False, f"expectedOutcomes length mismatch: expected {len(range_maxes)} values"
+            for index, (want, got) in enumerate(zip(expected, outcomes)):
+                if int(want) != got:
+                    return False, f"outcome mismatch at index {index}: expected={want} actual={got}"
+        return True, f"ok outcomes={len(outcomes)} cursor={counter}:{offset}"
+
+    outcome, counter = derive_with_key(key, client_seed, nonce, range_max)
     if "expectedOutcome" in row and int(row["expectedOutcome"]) != outcome:
         return False, f"outcome mismatch: expected={row['expectedOutcome']} actual={outcome}"
 
@@ -54,11 +168,26 @@ def verify_row(row: dict[str, Any], default_range_max: int) -> tuple[bool, str]:
 
 
 def run_single(args: argparse.Namespace) -> int:
+    if args.range_maxes is not None:
+        outcomes, (counter, offset) = derive_outcomes(
+            args.server_seed, args.client_seed, args.nonce, args.range_maxes
+        )
+        payload = {
+            "serverSeedHash": seed_key(args.server_seed).seed_hash,
+            "clientSeed": args.client_seed,
+            "nonce": args.nonce,
+            "rangeMaxes": args.range_maxes,
+            "derivedOutcomes": outcomes,
+            "cursor": {"counter": counter, "offset": offset},
+        }
+        print(json.dumps(payload, separators=(",", ":")))
+        return 0
+
     outcome, counter = derive_unbiased_outcome(
         args.server_seed, args.client_seed, args.nonce, args.range_max
     )
     payload = {
-        "serverSeedHash": hashlib.sha256(args.server_seed.encode("utf-8")).hexdigest(),
+        "serverSeedHash": seed_key(args.server_seed).seed_hash,
         "clientSeed": args.client_seed,
         "nonce": args.nonce,
         "rangeMax": args.range_max,
@@ -69,40 +198,136 @@ def run_single(args: argparse.Namespace) -> int:
     return 0
 
 
-def run_batch(args: argparse.Namespace) -> int:
-    path = Path(args.input)
-    if not path.exists():
-        print(f"input not found: {path}", file=sys.stderr)
-        return 2
+def iter_line_chunks(path: Path, chunk_lines: int) -> Iterator[list[tuple[int, str]]]:
+    """Stream (line number, text) pairs from the transcript in fixed-size chunks."""
+    chunk: list[tuple[int, str]] = []
+    with path.open("r", encoding="utf-8", buffering=1 << 20) as src:
+        for idx, line in enumerate(src, start=1):
+            if not line.strip():
+                continue
+            chunk.append((idx, line))
+            if len(chunk) >= chunk_lines:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
 
-    total = 0
+
+def verify_chunk(
+    chunk: list[tuple[int, str]], default_range_max: int, report: str = "text"
+) -> tuple[str, int, int, int | None]:
+    """Verify one chunk of transcript lines; returns (report text, rows, failed rows, first failed line).
+
+    Report text is rendered in the worker so the parent only writes it out:
+    text/jsonl emit every row, failures-only emits JSONL for failed rows, summary emits nothing.
+    """
+    out: list[str] = []
     failed = 0
-    for idx, line in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
-        if not line.strip():
-            continue
-        total += 1
+    first_failed = None
+    for idx, line in chunk:
         try:
             row = json.loads(line)
-            ok, detail = verify_row(row, args.default_range_max)
+            ok, detail = verify_row(row, default_range_max)
         except Exception as exc:
             ok, detail = False, f"parse/verify error: {exc}"
         if not ok:
             failed += 1
-        print(f"line={idx} status={'PASS' if ok else 'FAIL'} {detail}")
+            if first_failed is None:
+                first_failed = idx
+        if report == "text":
+            out.append(f"line={idx} status={'PASS' if ok else 'FAIL'} {detail}\n")
+        elif report == "jsonl" or (report == "failures-only" and not ok):
+            record = {"line": idx, "status": "PASS" if ok else "FAIL", "detail": detail}
+            out.append(json.dumps(record, separators=(",", ":")) + "\n")
+    return "".join(out), len(chunk), failed, first_failed
+
+
+def map_ordered(
+    executor: Executor | None, fn: Callable[..., Any], items: Iterable[Any], *args: Any
+) -> Iterator[Any]:
+    """Like executor.map, but only keeps a bounded window of chunks in flight."""
+    if executor is None:
+        for item in items:
+            yield fn(item, *args)
+        return
+    window = 2 * (getattr(executor, "_max_workers", 1) or 1)
+    pending: deque = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    path = Path(args.input)
+    if not path.exists():
+        print(f"input not found: {path}", file=sys.stderr)
+        return 2
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    total = 0
+    failed = 0
+    first_failed = None
+    try:
+        chunks = iter_line_chunks(path, args.chunk_lines)
+        results = map_ordered(executor, verify_chunk, chunks, args.default_range_max, args.report)
+        for text, rows, chunk_failed, chunk_first_failed in results:
+            if text:
+                sys.stdout.write(text)
+            total += rows
+            failed += chunk_failed
+            if first_failed is None:
+                first_failed = chunk_first_failed
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
 
-    summary = {"total": total, "failed": failed, "passed": total - failed}
+    summary: dict[str, Any] = {"total": total, "failed": failed, "passed": total - failed}
+    if args.report != "text":
+        summary["firstFailedLine"] = first_failed
     print(json.dumps(summary, separators=(",", ":")))
     return 1 if failed else 0
 
 
+def parse_range_maxes(text: str) -> list[int]:
+    try:
+        values = [int(part) for part in text.split(",") if part.strip()]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid rangeMax list: {exc}") from exc
+    if not values or any(value <= 0 for value in values):
+        raise argparse.ArgumentTypeError("rangeMax list must contain positive integers")
+    return values
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--server-seed")
     parser.add_argument("--client-seed")
     parser.add_argument("--nonce", type=int)
     parser.add_argument("--range-max", type=int, default=10_000)
+    parser.add_argument(
+        "--range-maxes",
+        type=parse_range_maxes,
+        help="Comma-separated rangeMax list; derive one outcome per entry from the same nonce",
+    )
     parser.add_argument("--input", help="Path to JSONL transcript")
     parser.add_argument("--default-range-max", type=int, default=10_000)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for batch mode (0 = CPU count)",
+    )
+    parser.add_argument(
+        "--report",
+        choices=REPORT_MODES,
+        default="text",
+        help="Batch output: text lines per row, jsonl per row, failures-only JSONL, or summary only",
+    )
+    parser.add_argument("--chunk-lines", type=int, default=CHUNK_LINES, help="Transcript lines per work unit")
     args = parser.parse_args()
 
     single_mode = all(
@@ -112,6 +337,8 @@ def parse_args() -> argparse.Namespace:
         parser.error("use either single mode args or --input batch mode, not both")
     if not args.input and not single_mode:
         parser.error("provide single mode args or --input")
+    if args.chunk_lines <= 0:
+        parser.error("--chunk-lines must be > 0")
     return args
 
 
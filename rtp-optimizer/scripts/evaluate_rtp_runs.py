@@ -5,36 +5,165 @@ from __future__ import annotations
 
 import argparse
 import csv
+import gzip
+import io
 import json
 import math
+import shutil
+import subprocess
 import sys
+import time
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator, TextIO
+
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+READ_BUFFER_BYTES = 1 << 20
+ESTIMATORS = ("mean", "pooled")
+DEFAULT_CS_HORIZON = {"runs": 1_000, "spins": 100_000_000}
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("--input", required=True, help="Path to .jsonl or .csv run file")
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="Path to .jsonl or .csv run file (optionally .gz or .zst compressed), or - for stdin",
+    )
+    parser.add_argument(
+        "--stdin-format",
+        choices=("jsonl", "csv"),
+        default="jsonl",
+        help="Row format when --input is -",
+    )
     parser.add_argument("--target-rtp", required=True, type=float)
     parser.add_argument("--tolerance", required=True, type=float)
     parser.add_argument("--min-runs", type=int, default=5)
     parser.add_argument("--rtp-field", default="rtp")
     parser.add_argument("--total-win-field", default="total_win")
     parser.add_argument("--total-bet-field", default="total_bet")
+    parser.add_argument(
+        "--estimator",
+        choices=ESTIMATORS,
+        default="mean",
+        help="mean: equal-weight mean of per-run RTP; pooled: sum(win)/sum(bet) across runs",
+    )
+    parser.add_argument(
+        "--win-sq-field",
+        default="sum_win_sq",
+        help="Per-run sum of squared per-spin wins (pooled estimator variance)",
+    )
+    parser.add_argument(
+        "--spins-field",
+        default="spins",
+        help="Per-run spin count (pooled estimator variance)",
+    )
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="Stop at the first row where an anytime-valid confidence sequence is inside/outside the band",
+    )
+    parser.add_argument("--alpha", type=float, default=0.05, help="Sequential error rate (two-sided)")
+    parser.add_argument(
+        "--cs-horizon",
+        type=float,
+        help="Units (runs, or spins for pooled spin variance) where the sequence is tightest "
+        "(default: 1000 runs / 1e8 spins)",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="With --sequential, keep reading a growing file until a decision or --idle-timeout",
+    )
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between --follow polls")
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=300.0,
+        help="Stop --follow after this many seconds without new rows",
+    )
     return parser.parse_args()
 
 
-def read_runs(path: Path) -> list[dict[str, Any]]:
-    if path.suffix.lower() == ".jsonl":
-        rows = []
-        for line in path.read_text(encoding="utf-8").splitlines():
+def run_format(path: Path) -> tuple[str, str]:
+    """Return (row format, compression) from the file name, e.g. runs.jsonl.zst -> (".jsonl", ".zst")."""
+    suffixes = [suffix.lower() for suffix in path.suffixes]
+    compression = suffixes.pop() if suffixes and suffixes[-1] in COMPRESSED_SUFFIXES else ""
+    row_format = suffixes[-1] if suffixes else ""
+    if row_format not in (".jsonl", ".csv"):
+        raise ValueError("input must be .jsonl or .csv (optionally .gz or .zst)")
+    return row_format, compression
+
+
+def open_zstd_text(path: Path) -> TextIO:
+    try:
+        import zstandard as zstd
+    except Exception:
+        if shutil.which("zstd") is None:
+            raise RuntimeError("reading .zst input requires the zstandard package or the zstd CLI")
+        proc = subprocess.Popen(["zstd", "-dc", "--", str(path)], stdout=subprocess.PIPE)
+        return io.TextIOWrapper(proc.stdout, encoding="utf-8", newline="")
+    reader = zstd.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+    return io.TextIOWrapper(io.BufferedReader(reader, READ_BUFFER_BYTES), encoding="utf-8", newline="")
+
+
+def open_text(path: Path, compression: str) -> TextIO:
+    if compression == ".gz":
+        return io.TextIOWrapper(
+            io.BufferedReader(gzip.open(path, "rb"), READ_BUFFER_BYTES), encoding="utf-8", newline=""
+        )
+    if compression == ".zst":
+        return open_zstd_text(path)
+    return path.open("r", encoding="utf-8", newline="", buffering=READ_BUFFER_BYTES)
+
+
+def follow_lines(handle: TextIO, poll_interval: float, idle_timeout: float) -> Iterator[str]:
+    """Yield complete lines from a file that is still being written, like tail -f."""
+    pending = ""
+    last_data = time.monotonic()
+    while True:
+        chunk = handle.readline()
+        if chunk:
+            pending += chunk
+            if pending.endswith("\n"):
+                yield pending
+                pending = ""
+            last_data = time.monotonic()
+            continue
+        if time.monotonic() - last_data >= idle_timeout:
+            break
+        time.sleep(poll_interval)
+    if pending:
+        yield pending
+
+
+def iter_runs(
+    path: Path,
+    stdin_format: str = "jsonl",
+    follow: bool = False,
+    poll_interval: float = 0.5,
+    idle_timeout: float = 300.0,
+) -> Iterator[dict[str, Any]]:
+    """Yield run rows one at a time; memory use does not grow with the file."""
+    if str(path) == "-":
+        row_format, source = f".{stdin_format}", nullcontext(sys.stdin)
+    else:
+        row_format, compression = run_format(path)
+        source = open_text(path, compression)
+    with source as handle:
+        lines: Iterable[str] = handle
+        if follow:
+            lines = follow_lines(handle, poll_interval, idle_timeout)
+        if row_format == ".csv":
+            yield from csv.DictReader(lines)
+            return
+        for line in lines:
             if line.strip():
-                rows.append(json.loads(line))
-        return rows
-    if path.suffix.lower() == ".csv":
-        with path.open("r", encoding="utf-8", newline="") as handle:
-            return list(csv.DictReader(handle))
-    raise ValueError("input must be .jsonl or .csv")
+                yield json.loads(line)
+
+
+def read_runs(path: Path) -> list[dict[str, Any]]:
+    return list(iter_runs(path))
 
 
 def coerce_float(value: Any) -> float:
@@ -59,60 +188,255 @@ def extract_rtp(row: dict[str, Any], args: argparse.Namespace) -> float:
     )
 
 
+def has_field(row: dict[str, Any], field: str) -> bool:
+    return field in row and row[field] is not None and str(row[field]).strip() != ""
+
+
+def extract_totals(
+    row: dict[str, Any], args: argparse.Namespace
+) -> tuple[float, float, float | None, float | None]:
+    """Return (total_win, total_bet, sum_win_sq, spins); the last two are None when absent."""
+    if not (has_field(row, args.total_win_field) and has_field(row, args.total_bet_field)):
+        raise ValueError(f"pooled estimator needs {args.total_win_field} and {args.total_bet_field}")
+    total_win = coerce_float(row[args.total_win_field])
+    total_bet = coerce_float(row[args.total_bet_field])
+    if total_bet <= 0:
+        raise ValueError("total_bet must be > 0")
+    if not (has_field(row, args.win_sq_field) and has_field(row, args.spins_field)):
+        return total_win, total_bet, None, None
+    win_sq = coerce_float(row[args.win_sq_field])
+    spins = coerce_float(row[args.spins_field])
+    if spins <= 0 or win_sq < 0:
+        raise ValueError(f"{args.spins_field} must be > 0 and {args.win_sq_field} >= 0")
+    return total_win, total_bet, win_sq, spins
+
+
+class RunningStats:
+    """Welford online mean/variance over per-run RTP values."""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def summary(self) -> dict[str, float]:
+        if self.n < 2:
+            return {"mean": self.mean, "stdev": 0.0, "sem": 0.0, "ci95": 0.0}
+        stdev = math.sqrt(self.m2 / (self.n - 1))
+        sem = stdev / math.sqrt(self.n)
+        ci95 = 1.96 * sem
+        return {"mean": self.mean, "stdev": stdev, "sem": sem, "ci95": ci95}
+
+
+class PooledStats:
+    """Ratio estimator RTP = sum(win) / sum(bet) over runs, accumulated online.
+
+    Variance is the delta-method variance of the ratio. When every run carries
+    per-spin second moments (sum_win_sq, spins) it is computed over spins,
+    assuming a constant bet within each run:
+
+        var = sum_j (w_j - R * b_j)^2 / B^2
+            = (sum(S2_i) - 2R * sum(W_i * b_i) + R^2 * sum(B_i * b_i)) / B^2,  b_i = B_i / N_i
+
+    Otherwise runs are the sampling unit: k / (k - 1) * sum_i (W_i - R * B_i)^2 / B^2.
+    """
+
+    __slots__ = (
+        "n",
+        "total_win",
+        "total_bet",
+        "win_sq",
+        "win_bet",
+        "bet_sq",
+        "spins",
+        "spin_win_sq",
+        "spin_win_bet",
+        "spin_bet_sq",
+        "spin_runs",
+    )
+
+    def __init__(self) -> None:
+        for name in self.__slots__:
+            setattr(self, name, 0 if name in ("n", "spin_runs") else 0.0)
+
+    def add(self, total_win: float, total_bet: float, win_sq: float | None, spins: float | None) -> None:
+        self.n += 1
+        self.total_win += total_win
+        self.total_bet += total_bet
+        self.win_sq += total_win * total_win
+        self.win_bet += total_win * total_bet
+        self.bet_sq += total_bet * total_bet
+        if win_sq is not None and spins is not None:
+            bet_per_spin = total_bet / spins
+            self.spin_runs += 1
+            self.spins += spins
+            self.spin_win_sq += win_sq
+            self.spin_win_bet += total_win * bet_per_spin
+            self.spin_bet_sq += total_bet * bet_per_spin
+
+    def summary(self) -> dict[str, Any]:
+        rtp = self.total_win / self.total_bet if self.total_bet > 0 else 0.0
+        bet_sq = self.total_bet * self.total_bet
+        if self.n and self.spin_runs == self.n:
+            source, units = "spins", self.spins
+            residual = self.spin_win_sq - 2.0 * rtp * self.spin_win_bet + rtp * rtp * self.spin_bet_sq
+        elif self.n >= 2:
+            source, units = "runs", self.n
+            residual = self.win_sq - 2.0 * rtp * self.win_bet + rtp * rtp * self.bet_sq
+            residual *= self.n / (self.n - 1)
+        else:
+            source, units, residual = "runs", self.n, 0.0
+        sem = math.sqrt(max(0.0, residual) / bet_sq) if bet_sq > 0 else 0.0
+        return {
+            "mean": rtp,
+            "stdev": sem * math.sqrt(units),
+            "sem": sem,
+            "ci95": 1.96 * sem,
+            "variance_source": source,
+            "total_win": self.total_win,
+            "total_bet": self.total_bet,
+            "spins": self.spins if source == "spins" else None,
+        }
+
+
+def cs_radius(sem: float, units: float, alpha: float, horizon: float) -> float:
+    """Half-width of a two-sided asymptotic confidence sequence (normal-mixture boundary).
+
+    Valid simultaneously over all stopping times, so the stream may be checked
+    after every row:
+
+        radius = sem * sqrt((t*rho^2 + 1) / (t*rho^2) * 2 * log(sqrt(t*rho^2 + 1) / alpha))
+
+    with t the sampling units seen so far and rho^2 chosen to minimise the
+    width at t = horizon (Waudby-Smith et al., time-uniform CLT).
+    """
+    if units <= 0:
+        return math.inf
+    log_term = -2.0 * math.log(alpha)
+    rho_sq = (log_term + math.log(log_term + 1.0)) / horizon
+    scaled = units * rho_sq
+    return sem * math.sqrt((scaled + 1.0) / scaled * 2.0 * math.log(math.sqrt(scaled + 1.0) / alpha))
+
+
 def summarize(rtps: list[float]) -> dict[str, float]:
-    n = len(rtps)
-    mean = sum(rtps) / n
-    if n < 2:
-        return {"mean": mean, "stdev": 0.0, "sem": 0.0, "ci95": 0.0}
-    variance = sum((x - mean) ** 2 for x in rtps) / (n - 1)
-    stdev = math.sqrt(variance)
-    sem = stdev / math.sqrt(n)
-    ci95 = 1.96 * sem
-    return {"mean": mean, "stdev": stdev, "sem": sem, "ci95": ci95}
+    stats = RunningStats()
+    for rtp in rtps:
+        stats.add(rtp)
+    return stats.summary()
+
+
+def sequential_decision(
+    run_stats: RunningStats | PooledStats,
+    args: argparse.Namespace,
+    lower_target: float,
+    upper_target: float,
+    final: bool = False,
+) -> dict[str, Any] | None:
+    """Return the decision summary once the confidence sequence clears the band, else None."""
+    stats = run_stats.summary()
+    runs = run_stats.n
+    source = stats.get("variance_source", "runs")
+    units = stats["spins"] if source == "spins" else runs
+    horizon = args.cs_horizon if args.cs_horizon else DEFAULT_CS_HORIZON[source]
+    mean = stats["mean"]
+    radius = cs_radius(stats["sem"], units, args.alpha, horizon)
+    lower, upper = mean - radius, mean + radius
+    if lower >= lower_target and upper <= upper_target:
+        decision = "inside"
+    elif upper < lower_target or lower > upper_target:
+        decision = "outside"
+    elif final:
+        decision = "undecided"
+    else:
+        return None
+    return {
+        "mode": "sequential",
+        "decision": decision,
+        "runs": runs,
+        "estimator": args.estimator,
+        "target_rtp": args.target_rtp,
+        "tolerance": args.tolerance,
+        "band": {"lower": lower_target, "upper": upper_target},
+        "alpha": args.alpha,
+        "mean_rtp": mean,
+        "sem": stats["sem"],
+        "cs": {"lower": lower, "upper": upper, "radius": radius, "units": units, "horizon": horizon},
+        "drift_vs_target": mean - args.target_rtp,
+        "passed": decision == "inside",
+    }
 
 
 def main() -> int:
     args = parse_args()
     path = Path(args.input)
-    if not path.exists():
+    if args.input != "-" and not path.exists():
         print(f"input not found: {path}", file=sys.stderr)
         return 2
 
+    if args.follow and not args.sequential:
+        print("--follow requires --sequential", file=sys.stderr)
+        return 2
+    if args.sequential and not 0 < args.alpha < 1:
+        print("--alpha must be in (0, 1)", file=sys.stderr)
+        return 2
+
+    lower_target = args.target_rtp - args.tolerance
+    upper_target = args.target_rtp + args.tolerance
+    pooled = args.estimator == "pooled"
+    run_stats: RunningStats | PooledStats = PooledStats() if pooled else RunningStats()
+    rows = iter_runs(path, args.stdin_format, args.follow, args.poll_interval, args.idle_timeout)
     try:
-        rows = read_runs(path)
+        for idx, row in enumerate(rows, start=1):
+            try:
+                if pooled:
+                    run_stats.add(*extract_totals(row, args))
+                else:
+                    run_stats.add(extract_rtp(row, args))
+            except Exception as exc:
+                print(f"line {idx}: invalid row: {exc}", file=sys.stderr)
+                return 2
+            if args.sequential and run_stats.n >= max(args.min_runs, 2):
+                decision = sequential_decision(run_stats, args, lower_target, upper_target)
+                if decision is not None:
+                    print(json.dumps(decision, separators=(",", ":")))
+                    return 0 if decision["passed"] else 1
     except Exception as exc:
         print(f"failed to read input: {exc}", file=sys.stderr)
         return 2
+    finally:
+        rows.close()
 
-    rtps: list[float] = []
-    for idx, row in enumerate(rows, start=1):
-        try:
-            rtp = extract_rtp(row, args)
-            rtps.append(rtp)
-        except Exception as exc:
-            print(f"line {idx}: invalid row: {exc}", file=sys.stderr)
-            return 2
+    if args.sequential and run_stats.n >= max(args.min_runs, 2):
+        decision = sequential_decision(run_stats, args, lower_target, upper_target, final=True)
+        print(json.dumps(decision, separators=(",", ":")))
+        return 1
 
-    if len(rtps) < args.min_runs:
+    if run_stats.n < args.min_runs:
         print(
-            f"insufficient runs: got {len(rtps)}, require at least {args.min_runs}",
+            f"insufficient runs: got {run_stats.n}, require at least {args.min_runs}",
             file=sys.stderr,
         )
         return 2
 
-    stats = summarize(rtps)
+    stats = run_stats.summary()
     mean = stats["mean"]
     ci95 = stats["ci95"]
 
-    lower_target = args.target_rtp - args.tolerance
-    upper_target = args.target_rtp + args.tolerance
-
     mean_in_band = lower_target <= mean <= upper_target
     ci_inside_band = (mean - ci95) >= lower_target and (mean + ci95) <= upper_target
     passed = mean_in_band and ci_inside_band
 
     summary = {
-        "runs": len(rtps),
+        "runs": run_stats.n,
+        "estimator": args.estimator,
         "target_rtp": args.target_rtp,
         "tolerance": args.tolerance,
         "band": {"lower": lower_target, "upper": upper_target},
@@ -125,6 +449,9 @@ def main() -> int:
         "ci_inside_band": ci_inside_band,
         "passed": passed,
     }
+    if pooled:
+        for key in ("variance_source", "total_win", "total_bet", "spins"):
+            summary[key] = stats[key]
     print(json.dumps(summary, separators=(",", ":")))
     return 0 if passed else 1
 